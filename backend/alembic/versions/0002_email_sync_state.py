@@ -0,0 +1,35 @@
+"""email sync state"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0002_email_sync_state"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0001 cria o schema a partir dos modelos atuais; só cria o que ainda não existe.
+    if sa.inspect(op.get_bind()).has_table("email_sync_states"):
+        return
+    op.create_table(
+        "email_sync_states",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("tenant_id", UUID(as_uuid=True), nullable=False, index=True),
+        sa.Column("email_account_id", UUID(as_uuid=True), sa.ForeignKey("email_accounts.id"), index=True),
+        sa.Column("folder", sa.String(255)),
+        sa.Column("uidvalidity", sa.BigInteger, nullable=True),
+        sa.Column("last_uid", sa.BigInteger),
+        sa.Column("highest_modseq", sa.BigInteger, nullable=True),
+        sa.Column("backfill_before_uid", sa.BigInteger, nullable=True),
+        sa.Column("backfill_done", sa.Boolean),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("email_account_id", "folder", name="uq_email_sync_state_folder"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("email_sync_states")
@@ -0,0 +1,19 @@
+"""attachment size"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003_attachment_size"
+down_revision = "0002_email_sync_state"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("email_attachments")}
+    if "size_bytes" not in columns:
+        op.add_column("email_attachments", sa.Column("size_bytes", sa.BigInteger, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("email_attachments", "size_bytes")
@@ -0,0 +1,40 @@
+"""attachment blobs"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0004_attachment_blobs"
+down_revision = "0003_attachment_size"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("attachment_blobs"):
+        op.create_table(
+            "attachment_blobs",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("tenant_id", UUID(as_uuid=True), nullable=False, index=True),
+            sa.Column("sha256", sa.String(64)),
+            sa.Column("file_path", sa.Text),
+            sa.Column("size_bytes", sa.BigInteger),
+            sa.Column("ref_count", sa.Integer),
+            sa.Column("created_at", sa.DateTime(timezone=True)),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.UniqueConstraint("tenant_id", "sha256", name="uq_attachment_blob_sha256"),
+        )
+    # Anexos antigos continuam no caminho por e-mail; registra um blob por (tenant, sha256) apontando para eles.
+    op.execute(
+        """
+        INSERT INTO attachment_blobs (tenant_id, sha256, file_path, size_bytes, ref_count, created_at)
+        SELECT tenant_id, sha256, MIN(file_path), COALESCE(MAX(size_bytes), 0), COUNT(*), NOW()
+        FROM email_attachments
+        GROUP BY tenant_id, sha256
+        ON CONFLICT ON CONSTRAINT uq_attachment_blob_sha256 DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("attachment_blobs")
@@ -0,0 +1,32 @@
+"""extracted text cache"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005_extracted_text_cache"
+down_revision = "0004_attachment_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("extracted_text_cache"):
+        return
+    op.create_table(
+        "extracted_text_cache",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("sha256", sa.String(64)),
+        sa.Column("extractor", sa.String(40)),
+        sa.Column("extractor_version", sa.String(20)),
+        sa.Column("max_chars", sa.Integer),
+        sa.Column("text", sa.Text),
+        sa.Column("size_bytes", sa.Integer),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), index=True),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("sha256", "extractor", "extractor_version", "max_chars", name="uq_extracted_text_cache_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("extracted_text_cache")
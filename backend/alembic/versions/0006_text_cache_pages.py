@@ -0,0 +1,25 @@
+"""text cache page coverage"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006_text_cache_pages"
+down_revision = "0005_extracted_text_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("extracted_text_cache")}
+    if "pages_total" not in columns:
+        op.add_column("extracted_text_cache", sa.Column("pages_total", sa.Integer, nullable=True))
+    if "pages_covered" not in columns:
+        op.add_column("extracted_text_cache", sa.Column("pages_covered", sa.Integer, nullable=True))
+    if "truncated" not in columns:
+        op.add_column("extracted_text_cache", sa.Column("truncated", sa.Boolean, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column("extracted_text_cache", "truncated")
+    op.drop_column("extracted_text_cache", "pages_covered")
+    op.drop_column("extracted_text_cache", "pages_total")
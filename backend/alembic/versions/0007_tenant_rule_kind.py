@@ -0,0 +1,40 @@
+"""tenant rule kind and lookup indexes"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007_tenant_rule_kind"
+down_revision = "0006_text_cache_pages"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("tenant_rules")}
+    if "kind" not in columns:
+        op.add_column("tenant_rules", sa.Column("kind", sa.String(20), nullable=True))
+    # Mesma classificação de models.rule_kind, aplicada às linhas já existentes.
+    op.execute(
+        """
+        UPDATE tenant_rules SET kind = CASE
+            WHEN rule_name LIKE 'notify:%' THEN 'notify'
+            WHEN rule_name LIKE 'sync:account:%' THEN 'sync'
+            WHEN rule_name LIKE 'profile:%' THEN 'profile'
+            WHEN rule_name LIKE 'route:%' THEN 'route'
+            ELSE 'rule'
+        END
+        WHERE kind IS NULL
+        """
+    )
+    indexes = {i["name"] for i in inspector.get_indexes("tenant_rules")}
+    if "ix_tenant_rules_tenant_rule_name" not in indexes:
+        op.create_index("ix_tenant_rules_tenant_rule_name", "tenant_rules", ["tenant_id", "rule_name"])
+    if "ix_tenant_rules_tenant_kind" not in indexes:
+        op.create_index("ix_tenant_rules_tenant_kind", "tenant_rules", ["tenant_id", "kind"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tenant_rules_tenant_kind", table_name="tenant_rules")
+    op.drop_index("ix_tenant_rules_tenant_rule_name", table_name="tenant_rules")
+    op.drop_column("tenant_rules", "kind")
@@ -0,0 +1,19 @@
+"""email account sync lease"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008_email_account_sync_lease"
+down_revision = "0007_tenant_rule_kind"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("email_accounts")}
+    if "sync_lease_until" not in columns:
+        op.add_column("email_accounts", sa.Column("sync_lease_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("email_accounts", "sync_lease_until")
@@ -0,0 +1,36 @@
+"""notification outbox"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "0009_notification_outbox"
+down_revision = "0008_email_account_sync_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("notification_outbox"):
+        return
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("tenant_id", UUID(as_uuid=True), nullable=False, index=True),
+        sa.Column("document_id", UUID(as_uuid=True), sa.ForeignKey("documents.id"), nullable=True),
+        sa.Column("channel", sa.String(20)),
+        sa.Column("target", sa.Text, nullable=True),
+        sa.Column("payload", JSONB),
+        sa.Column("status", sa.String(20)),
+        sa.Column("attempts", sa.Integer),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_notification_outbox_due", "notification_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("notification_outbox")
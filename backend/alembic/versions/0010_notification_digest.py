@@ -0,0 +1,19 @@
+"""notification digest key"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0010_notification_digest"
+down_revision = "0009_notification_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("notification_outbox")}
+    if "digest_key" not in columns:
+        op.add_column("notification_outbox", sa.Column("digest_key", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("notification_outbox", "digest_key")
@@ -0,0 +1,27 @@
+"""keyset pagination indexes"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0011_keyset_indexes"
+down_revision = "0010_notification_digest"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_documents_tenant_created", "documents"),
+    ("ix_emails_tenant_created", "emails"),
+    ("ix_users_tenant_created", "users"),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table in INDEXES:
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, ["tenant_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    for name, table in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,26 @@
+"""review queue indexes"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0012_review_queue_indexes"
+down_revision = "0011_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_documents_tenant_review", "documents", ["tenant_id", "needs_review", "created_at"]),
+    ("ix_dead_letters_entity", "dead_letters", ["entity_type", "entity_id"]),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
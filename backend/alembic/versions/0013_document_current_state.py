@@ -0,0 +1,42 @@
+"""document current classification/extraction pointers"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0013_document_current_state"
+down_revision = "0012_review_queue_indexes"
+branch_labels = None
+depends_on = None
+
+POINTERS = (
+    ("current_classification_id", "classifications", "fk_documents_current_classification"),
+    ("current_extraction_id", "extractions", "fk_documents_current_extraction"),
+)
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("documents")}
+    for column, table, fk_name in POINTERS:
+        if column in columns:
+            continue
+        op.add_column("documents", sa.Column(column, UUID(as_uuid=True), nullable=True))
+        op.create_foreign_key(fk_name, "documents", table, [column], ["id"])
+        # Backfill: aponta cada documento para a linha mais recente do histórico.
+        op.execute(
+            f"""
+            UPDATE documents d SET {column} = latest.id
+            FROM (
+                SELECT DISTINCT ON (document_id) id, document_id
+                FROM {table}
+                ORDER BY document_id, created_at DESC
+            ) latest
+            WHERE latest.document_id = d.id
+            """
+        )
+
+
+def downgrade() -> None:
+    for column, _, fk_name in POINTERS:
+        op.drop_constraint(fk_name, "documents", type_="foreignkey")
+        op.drop_column("documents", column)
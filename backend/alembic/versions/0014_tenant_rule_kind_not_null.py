@@ -0,0 +1,29 @@
+"""tenant_rules.kind not null"""
+
+from alembic import op
+
+revision = "0014_tenant_rule_kind_not_null"
+down_revision = "0013_document_current_state"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0007 criou a coluna como nullable; o modelo (e o create_all) a declara NOT NULL.
+    op.execute(
+        """
+        UPDATE tenant_rules SET kind = CASE
+            WHEN rule_name LIKE 'notify:%' THEN 'notify'
+            WHEN rule_name LIKE 'sync:account:%' THEN 'sync'
+            WHEN rule_name LIKE 'profile:%' THEN 'profile'
+            WHEN rule_name LIKE 'route:%' THEN 'route'
+            ELSE 'rule'
+        END
+        WHERE kind IS NULL
+        """
+    )
+    op.alter_column("tenant_rules", "kind", nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column("tenant_rules", "kind", nullable=True)
@@ -1,5 +1,10 @@
-from email import message_from_bytes
-from typing import Any
+import base64
+import binascii
+import socket
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from typing import Any, Iterator
+from urllib.parse import unquote
 
 from imapclient import IMAPClient
 
@@ -14,68 +19,309 @@ class ImapClientAdapter:
         self.password = decrypt_secret(password_enc)
         self.use_ssl = use_ssl
 
+    def connect(self) -> IMAPClient:
+        client = IMAPClient(self.host, port=self.port, ssl=self.use_ssl)
+        client.login(self.username, self.password)
+        return client
+
     def test_connection(self) -> bool:
-        with IMAPClient(self.host, port=self.port, ssl=self.use_ssl) as client:
-            client.login(self.username, self.password)
+        with self.connect():
             return True
 
-    def fetch_recent(self, folder: str = "INBOX", limit: int = 20) -> list[dict[str, Any]]:
-        emails: list[dict[str, Any]] = []
-        with IMAPClient(self.host, port=self.port, ssl=self.use_ssl) as client:
-            client.login(self.username, self.password)
-            client.select_folder(folder)
-            messages = client.search(["ALL"])
-            for uid, data in client.fetch(messages[-limit:], [b"RFC822"]).items():
-                raw = data[b"RFC822"]
-                msg = message_from_bytes(raw)
-                body_text = self._extract_body_text(msg)
-                attachments = self._extract_attachments(msg)
-                emails.append(
-                    {
-                        "message_id": msg.get("Message-ID", str(uid)),
-                        "subject": msg.get("Subject", ""),
-                        "sender": msg.get("From", ""),
-                        "body_text": body_text,
-                        "attachments": attachments,
-                        "raw": raw,
-                    }
-                )
-        return emails
-
-    def _extract_body_text(self, msg) -> str:
-        if msg.is_multipart():
-            parts: list[str] = []
-            for part in msg.walk():
-                content_disposition = str(part.get("Content-Disposition", ""))
-                if "attachment" in content_disposition.lower():
-                    continue
-                if part.get_content_type() == "text/plain":
-                    payload = part.get_payload(decode=True) or b""
-                    charset = part.get_content_charset() or "utf-8"
-                    parts.append(payload.decode(charset, errors="ignore"))
-            return "\n".join(parts).strip()
-
-        payload = msg.get_payload(decode=True) or b""
-        charset = msg.get_content_charset() or "utf-8"
-        return payload.decode(charset, errors="ignore").strip()
-
-    def _extract_attachments(self, msg) -> list[dict[str, Any]]:
+    def select(self, client: IMAPClient, folder: str) -> dict[str, int | None]:
+        if client.has_capability("CONDSTORE") and client.has_capability("ENABLE"):
+            try:
+                client.enable("CONDSTORE")
+            except Exception:
+                pass
+        info = client.select_folder(folder)
+        return {
+            "uidvalidity": _int_or_none(info.get(b"UIDVALIDITY")),
+            "uidnext": _int_or_none(info.get(b"UIDNEXT")),
+            "highest_modseq": _int_or_none(info.get(b"HIGHESTMODSEQ")),
+        }
+
+    def supports_idle(self, client: IMAPClient) -> bool:
+        return client.has_capability("IDLE")
+
+    def idle_wait(self, client: IMAPClient, timeout: int) -> bool:
+        # Bloqueia até o servidor avisar de mudança na pasta selecionada ou até o timeout
+        # (renovar o IDLE antes dos 29 min da RFC 2177 também mantém a sessão viva).
+        client.idle()
+        try:
+            responses = client.idle_check(timeout=timeout)
+        finally:
+            # EXISTS que chega entre o idle_check e o DONE vem no retorno do idle_done.
+            _, done_responses = client.idle_done()
+        return _has_new_messages(list(responses or []) + list(done_responses or []))
+
+    def interrupt(self, client: IMAPClient) -> None:
+        # Desbloqueia, a partir de outra thread, um idle_check/noop em andamento nesta sessão.
+        try:
+            client.socket().shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def poll(self, client: IMAPClient) -> bool:
+        _, responses = client.noop()
+        return _has_new_messages(responses)
+
+    def plan_sync(
+        self,
+        client: IMAPClient,
+        folder: str,
+        *,
+        uidvalidity: int | None,
+        last_uid: int,
+        highest_modseq: int | None,
+        backfill_before_uid: int | None,
+        batch_size: int,
+        backfill: bool = False,
+    ) -> dict[str, Any]:
+        status = self.select(client, folder)
+        reset = uidvalidity is None or status["uidvalidity"] != uidvalidity
+        if reset:
+            last_uid, highest_modseq, backfill_before_uid = 0, None, None
+        plan: dict[str, Any] = {**status, "uids": [], "has_more": False, "reset": reset}
+
+        if backfill:
+            # Pagina o histórico do mais novo para o mais antigo, abaixo do menor UID já visto.
+            if backfill_before_uid is None:
+                candidates = client.search(["ALL"])
+            elif backfill_before_uid > 1:
+                candidates = client.search(["UID", f"1:{backfill_before_uid - 1}"])
+            else:
+                candidates = []
+            uids = sorted(u for u in candidates if backfill_before_uid is None or u < backfill_before_uid)
+            plan["uids"] = uids[-batch_size:]
+            plan["has_more"] = len(uids) > batch_size
+            return plan
+
+        if last_uid == 0:
+            # Primeira sincronização: pega só o lote mais recente; o restante fica para o backfill.
+            plan["uids"] = sorted(client.search(["ALL"]))[-batch_size:]
+            return plan
+
+        if highest_modseq is not None and status["highest_modseq"] == highest_modseq:
+            return plan
+        if status["uidnext"] is not None and status["uidnext"] <= last_uid + 1:
+            return plan
+
+        uids = sorted(u for u in client.search(["UID", f"{last_uid + 1}:*"]) if u > last_uid)
+        plan["uids"] = uids[:batch_size]
+        plan["has_more"] = len(uids) > batch_size
+        return plan
+
+    def fetch_headers(self, client: IMAPClient, uids: list[int]) -> list[dict[str, Any]]:
+        # Primeira fase: só cabeçalhos e BODYSTRUCTURE, sem baixar o conteúdo das partes.
         items: list[dict[str, Any]] = []
-        if not msg.is_multipart():
+        if not uids:
             return items
-
-        for part in msg.walk():
-            filename = part.get_filename()
-            if not filename:
-                continue
-            content = part.get_payload(decode=True) or b""
-            if not content:
-                continue
+        response = client.fetch(uids, [b"BODYSTRUCTURE", b"BODY.PEEK[HEADER]", b"RFC822.SIZE"])
+        for uid in sorted(response):
+            data = response[uid]
+            headers = BytesHeaderParser().parsebytes(_body_section(data) or b"")
+            structure = data.get(b"BODYSTRUCTURE")
+            multipart = bool(structure is not None and structure.is_multipart)
+            parts = _walk_bodystructure(structure) if structure is not None else []
             items.append(
                 {
-                    "filename": filename,
-                    "mime_type": part.get_content_type(),
-                    "content": content,
+                    "uid": uid,
+                    "message_id": headers.get("Message-ID", str(uid)),
+                    "subject": headers.get("Subject", ""),
+                    "sender": headers.get("From", ""),
+                    "size": _int_or_none(data.get(b"RFC822.SIZE")) or 0,
+                    "text_parts": _text_parts(parts, multipart),
+                    "attachments": [p for p in parts if multipart and p["filename"]],
                 }
             )
         return items
+
+    def fetch_body_text(self, client: IMAPClient, uid: int, text_parts: list[dict[str, Any]]) -> str:
+        chunks: list[str] = []
+        for part in text_parts:
+            payload = b"".join(self.iter_part(client, uid, part))
+            chunks.append(_decode_charset(payload, part.get("charset")))
+        return "\n".join(chunks).strip()
+
+    def iter_part(
+        self,
+        client: IMAPClient,
+        uid: int,
+        part: dict[str, Any],
+        chunk_size: int = 1024 * 1024,
+    ) -> Iterator[bytes]:
+        # Baixa a parte em fatias (BODY.PEEK[n]<offset.len>) e decodifica incrementalmente.
+        decoder = _TransferDecoder(part.get("encoding"))
+        offset = 0
+        while True:
+            section = f"BODY.PEEK[{part['part']}]<{offset}.{chunk_size}>"
+            data = client.fetch([uid], [section.encode()]).get(uid, {})
+            raw = _body_section(data) or b""
+            if raw:
+                decoded = decoder.feed(raw)
+                if decoded:
+                    yield decoded
+            if len(raw) < chunk_size:
+                break
+            offset += len(raw)
+        tail = decoder.flush()
+        if tail:
+            yield tail
+
+
+def _int_or_none(value) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _has_new_messages(responses) -> bool:
+    return any(
+        isinstance(item, tuple) and len(item) > 1 and item[1] in (b"EXISTS", b"RECENT") for item in responses or []
+    )
+
+
+def _body_section(data: dict) -> bytes | None:
+    for key, value in data.items():
+        if isinstance(key, bytes) and key.startswith(b"BODY[") and isinstance(value, bytes):
+            return value
+    return None
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="ignore")
+    return str(value)
+
+
+def _decode_header_value(value: str) -> str:
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def _params(raw) -> dict[str, str]:
+    if not isinstance(raw, (tuple, list)):
+        return {}
+    items = list(raw)
+    params: dict[str, str] = {}
+    for key, value in zip(items[0::2], items[1::2]):
+        params[_text(key).lower()] = _text(value)
+    return params
+
+
+def _param(params: dict[str, str], name: str) -> str | None:
+    if name in params:
+        return _decode_header_value(params[name])
+    if f"{name}*" in params:
+        return _decode_rfc2231(params[f"{name}*"])
+    # Continuação RFC 2231 (filename*0*, filename*1*, ...).
+    pieces = sorted(
+        (int(key[len(name) + 1 :].rstrip("*")), key)
+        for key in params
+        if key.startswith(f"{name}*") and key[len(name) + 1 :].rstrip("*").isdigit()
+    )
+    if not pieces:
+        return None
+    joined = "".join(params[key] for _, key in pieces)
+    return _decode_rfc2231(joined) if pieces[0][1].endswith("*") else joined
+
+
+def _decode_rfc2231(value: str) -> str:
+    charset, _, text = value.split("'", 2) if value.count("'") >= 2 else ("", "", value)
+    try:
+        return unquote(text, encoding=charset or "utf-8", errors="replace")
+    except LookupError:
+        return unquote(text)
+
+
+def _walk_bodystructure(body, prefix: str = "") -> list[dict[str, Any]]:
+    if body.is_multipart:
+        parts: list[dict[str, Any]] = []
+        for index, child in enumerate(body[0], start=1):
+            parts.extend(_walk_bodystructure(child, f"{prefix}.{index}" if prefix else str(index)))
+        return parts
+
+    maintype = _text(body[0]).lower()
+    subtype = _text(body[1]).lower()
+    params = _params(body[2])
+    if maintype == "text":
+        disposition_index = 9
+    elif maintype == "message" and subtype == "rfc822":
+        disposition_index = 11
+    else:
+        disposition_index = 8
+    disposition = body[disposition_index] if len(body) > disposition_index else None
+    disposition_type = ""
+    disposition_params: dict[str, str] = {}
+    if isinstance(disposition, tuple) and disposition:
+        disposition_type = _text(disposition[0]).lower()
+        disposition_params = _params(disposition[1] if len(disposition) > 1 else None)
+
+    return [
+        {
+            "part": prefix or "1",
+            "mime_type": f"{maintype}/{subtype}",
+            "encoding": _text(body[5]).lower(),
+            "size": _int_or_none(body[6]) or 0,
+            "charset": params.get("charset"),
+            "filename": _param(disposition_params, "filename") or _param(params, "name"),
+            "disposition": disposition_type,
+        }
+    ]
+
+
+def _text_parts(parts: list[dict[str, Any]], multipart: bool) -> list[dict[str, Any]]:
+    if not multipart:
+        return parts[:1]
+    return [p for p in parts if p["mime_type"] == "text/plain" and p["disposition"] != "attachment"]
+
+
+def _decode_charset(payload: bytes, charset: str | None) -> str:
+    try:
+        return payload.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+class _TransferDecoder:
+    def __init__(self, encoding: str | None):
+        self.encoding = (encoding or "").lower()
+        self.buffer = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self.encoding == "base64":
+            data = self.buffer + b"".join(chunk.split())
+            usable = len(data) - len(data) % 4
+            self.buffer = data[usable:]
+            return _b64decode(data[:usable])
+        if self.encoding == "quoted-printable":
+            data = self.buffer + chunk
+            cut = data.rfind(b"\n") + 1
+            self.buffer = data[cut:]
+            return binascii.a2b_qp(data[:cut])
+        return chunk
+
+    def flush(self) -> bytes:
+        data, self.buffer = self.buffer, b""
+        if not data:
+            return b""
+        if self.encoding == "base64":
+            return _b64decode(data + b"=" * (-len(data) % 4))
+        if self.encoding == "quoted-printable":
+            return binascii.a2b_qp(data)
+        return data
+
+
+def _b64decode(data: bytes) -> bytes:
+    try:
+        return base64.b64decode(data)
+    except (binascii.Error, ValueError):
+        return b""
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import re
+import time
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from backend.app.adapters.llm.openai_provider import OpenAIProvider
+from backend.app.adapters.llm.provider import LLMProvider
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "llm:cache"
+LRU_KEY = f"{CACHE_PREFIX}:lru"
+STATS_KEY = f"{CACHE_PREFIX}:stats"
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Só espaços são normalizados: CNPJ, valores, CFOP e códigos de serviço distinguem documentos.
+    return re.sub(r"\s+", " ", prompt or "").strip()
+
+
+class CachedLLMProvider(LLMProvider):
+    def __init__(
+        self,
+        inner: LLMProvider,
+        client: Redis | None = None,
+        ttl_seconds: int | None = None,
+        max_entries: int | None = None,
+        enabled: bool | None = None,
+    ):
+        settings = get_settings()
+        self.inner = inner
+        self.enabled = settings.llm_cache_enabled if enabled is None else enabled
+        self.redis = client or get_redis()
+        self.ttl_seconds = ttl_seconds or settings.llm_cache_ttl_seconds
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+        self.model = getattr(inner, "model", "")
+
+    @property
+    def client(self):
+        return getattr(self.inner, "client", None)
+
+    @property
+    def cacheable(self) -> bool:
+        # O fallback por palavras-chave (sem API key) é gratuito e não deve ocupar o cache.
+        return self.enabled and self.client is not None
+
+    def cache_key(self, kind: str, prompt: str, scope: str = "") -> str:
+        raw = "\x1f".join([kind, self.model, scope, normalize_prompt(prompt)])
+        return f"{CACHE_PREFIX}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def lookup(self, kind: str, prompt: str, scope: str = "") -> dict | None:
+        if not self.cacheable:
+            return None
+        key = self.cache_key(kind, prompt, scope)
+        try:
+            raw = self.redis.get(key)
+            if raw is None:
+                self.redis.hincrby(STATS_KEY, f"{kind}:misses", 1)
+                return None
+            pipe = self.redis.pipeline()
+            pipe.zadd(LRU_KEY, {key: time.time()})
+            pipe.hincrby(STATS_KEY, f"{kind}:hits", 1)
+            pipe.execute()
+        except RedisError as exc:
+            logger.warning("llm_cache_unavailable error=%s", exc)
+            return None
+        return json.loads(raw)
+
+    def store(self, kind: str, prompt: str, payload: dict, scope: str = "") -> None:
+        if not self.cacheable:
+            return
+        key = self.cache_key(kind, prompt, scope)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(key, json.dumps(payload, ensure_ascii=False), ex=self.ttl_seconds)
+            pipe.zadd(LRU_KEY, {key: time.time()})
+            pipe.zcard(LRU_KEY)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [item for item, _ in self.redis.zpopmin(LRU_KEY, size - self.max_entries)]
+                if evicted:
+                    self.redis.delete(*evicted)
+        except RedisError as exc:
+            logger.warning("llm_cache_unavailable error=%s", exc)
+
+    def evict(self, kind: str, prompt: str, scope: str = "") -> None:
+        # Usado quando a resposta em cache não passou na validação do chamador.
+        key = self.cache_key(kind, prompt, scope)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(key)
+            pipe.zrem(LRU_KEY, key)
+            pipe.execute()
+        except RedisError as exc:
+            logger.warning("llm_cache_unavailable error=%s", exc)
+
+    def _cached_call(self, kind: str, prompt: str, scope: str, call) -> tuple[dict, bool]:
+        payload = self.lookup(kind, prompt, scope)
+        if payload is not None:
+            return payload, True
+        payload = call(prompt)
+        self.store(kind, prompt, payload, scope)
+        return payload, False
+
+    def classify_cached(self, prompt: str, scope: str = "", cache: bool = True) -> tuple[dict, bool]:
+        # Devolve também se veio do cache, para o chamador não contabilizar acertos em llm_calls.
+        if not cache:
+            return self.inner.classify(prompt), False
+        return self._cached_call("classify", prompt, scope, self.inner.classify)
+
+    def classify(self, prompt: str, scope: str = "", cache: bool = True) -> dict:
+        return self.classify_cached(prompt, scope, cache)[0]
+
+    def extract(self, prompt: str, scope: str = "", cache: bool = True) -> dict:
+        if not cache:
+            return self.inner.extract(prompt)
+        return self._cached_call("extract", prompt, scope, self.inner.extract)[0]
+
+
+def build_llm_provider() -> CachedLLMProvider:
+    return CachedLLMProvider(OpenAIProvider())
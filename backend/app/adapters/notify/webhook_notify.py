@@ -15,3 +15,9 @@ class WebhookNotifyAdapter:
             logger.info("notify_webhook url=%s status=%s", url, response.status_code)
         except Exception as exc:
             logger.warning("notify_webhook_failed url=%s error=%s", url, exc)
+
+    async def post(self, client: httpx.AsyncClient, url: str, payload: dict) -> None:
+        # Variante do dispatcher: usa o cliente compartilhado e propaga a falha para o retry do outbox.
+        response = await client.post(url, json=payload)
+        logger.info("notify_webhook url=%s status=%s", url, response.status_code)
+        response.raise_for_status()
@@ -1,7 +1,66 @@
+import hashlib
+import os
+import tempfile
 from pathlib import Path
+from typing import BinaryIO, Iterable
 
 from backend.app.core.config import get_settings
-from backend.app.utils.crypto import sha256_bytes
+
+CHUNK_SIZE = 1024 * 1024
+TMP_PREFIX = ".tmp-"
+
+
+class StorageLimitExceeded(ValueError):
+    pass
+
+
+def _iter_chunks(source: bytes | BinaryIO | Iterable[bytes]) -> Iterable[bytes]:
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source)
+        return
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    for chunk in source:
+        if chunk:
+            yield chunk
+
+
+def _write_temp(
+    source: bytes | BinaryIO | Iterable[bytes],
+    directory: Path,
+    max_bytes: int | None = None,
+) -> tuple[Path, int, str]:
+    # Grava em arquivo temporário calculando o SHA-256 na mesma passada.
+    directory.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in _iter_chunks(source):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise StorageLimitExceeded(f"storage_limit_exceeded: {size} > {max_bytes}")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return Path(tmp_name), size, digest.hexdigest()
+
+
+def write_stream(
+    source: bytes | BinaryIO | Iterable[bytes],
+    destination: Path,
+    max_bytes: int | None = None,
+) -> tuple[int, str]:
+    tmp_path, size, sha256 = _write_temp(source, destination.parent, max_bytes=max_bytes)
+    os.replace(tmp_path, destination)
+    return size, sha256
 
 
 class LocalStorageAdapter:
@@ -9,9 +68,31 @@ class LocalStorageAdapter:
         self.root = Path(get_settings().storage_root)
         self.root.mkdir(parents=True, exist_ok=True)
 
-    def save_attachment(self, tenant_id: str, email_id: str, filename: str, content: bytes) -> tuple[str, str]:
-        folder = self.root / tenant_id / email_id
-        folder.mkdir(parents=True, exist_ok=True)
-        path = folder / filename
-        path.write_bytes(content)
-        return str(path), sha256_bytes(content)
+    def blob_path(self, tenant_id: str, sha256: str) -> Path:
+        return self.root / tenant_id / "blobs" / sha256[:2] / sha256[2:4] / sha256
+
+    def save_blob_stream(
+        self,
+        tenant_id: str,
+        source: bytes | BinaryIO | Iterable[bytes],
+        max_bytes: int | None = None,
+    ) -> tuple[str, str, int]:
+        # Layout endereçado por conteúdo: o mesmo anexo é gravado uma única vez por tenant.
+        tmp_path, size, sha256 = _write_temp(source, self.root / tenant_id / "blobs", max_bytes=max_bytes)
+        path = self.blob_path(tenant_id, sha256)
+        if path.exists():
+            tmp_path.unlink(missing_ok=True)
+            # Renova o mtime para o GC não remover um blob que acabou de ser reutilizado.
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        return str(path), sha256, size
+
+    def iter_blob_files(self):
+        for path in self.root.glob("*/blobs/**/*"):
+            if path.is_file():
+                yield path
+
+    def remove(self, file_path: str) -> None:
+        Path(file_path).unlink(missing_ok=True)
@@ -5,6 +5,12 @@ from pydantic import BaseModel
 
 from backend.app.api.v1.deps import DbDep, get_current_user
 from backend.app.db import models
+from backend.app.domain.tenant_config.service import (
+    DEFAULT_DIGEST_MAX_DOCUMENTS,
+    DEFAULT_DIGEST_WINDOW_SECONDS,
+    bump_tenant_config,
+    notification_channels,
+)
 
 router = APIRouter(prefix="/configs", tags=["configs"])
 
@@ -41,6 +47,12 @@ class NotificationChannelsPayload(BaseModel):
     email_webhook_url: str | None = None
     whatsapp_webhook_url: str | None = None
     telegram_webhook_url: str | None = None
+    digest_channels: list[str] = []
+    digest_window_seconds: int = DEFAULT_DIGEST_WINDOW_SECONDS
+    digest_max_documents: int = DEFAULT_DIGEST_MAX_DOCUMENTS
+
+
+DIGEST_CHANNELS = {"email", "whatsapp", "telegram"}
 
 
 class DocumentProfilePayload(BaseModel):
@@ -83,6 +95,7 @@ def add_rule(payload: RulePayload, db: DbDep, current_user: Annotated[models.Use
     )
     db.add(item)
     db.commit()
+    bump_tenant_config(current_user.tenant_id)
     db.refresh(item)
     return {"id": item.id}
 
@@ -149,6 +162,7 @@ def add_schema(payload: SchemaPayload, db: DbDep, current_user: Annotated[models
     item = models.ExtractionSchema(tenant_id=current_user.tenant_id, doc_type=payload.doc_type, schema=payload.schema)
     db.add(item)
     db.commit()
+    bump_tenant_config(current_user.tenant_id)
     db.refresh(item)
     return {"id": item.id}
 
@@ -163,7 +177,7 @@ def list_routes(
     query = (
         db.query(models.TenantRule)
         .filter(models.TenantRule.tenant_id == current_user.tenant_id)
-        .filter(models.TenantRule.rule_name.like("route:%"))
+        .filter(models.TenantRule.kind == "route")
     )
     if active_only:
         query = query.filter(models.TenantRule.is_active == True)
@@ -198,6 +212,7 @@ def add_route(payload: RoutePayload, db: DbDep, current_user: Annotated[models.U
     )
     db.add(item)
     db.commit()
+    bump_tenant_config(current_user.tenant_id)
     db.refresh(item)
     return {"id": item.id}
 
@@ -212,15 +227,7 @@ def get_notifications(
         .filter(models.TenantRule.tenant_id == current_user.tenant_id, models.TenantRule.rule_name == "notify:channels")
         .first()
     )
-    definition = rule.definition if rule and rule.definition else {}
-    return {
-        "emails": definition.get("emails", []),
-        "whatsapp_numbers": definition.get("whatsapp_numbers", []),
-        "telegram_users": definition.get("telegram_users", []),
-        "email_webhook_url": definition.get("email_webhook_url"),
-        "whatsapp_webhook_url": definition.get("whatsapp_webhook_url"),
-        "telegram_webhook_url": definition.get("telegram_webhook_url"),
-    }
+    return notification_channels(rule.definition if rule else None)
 
 
 @router.post("/notifications")
@@ -229,6 +236,10 @@ def set_notifications(
     db: DbDep,
     current_user: Annotated[models.User, Depends(get_current_user)],
 ):
+    if set(payload.digest_channels) - DIGEST_CHANNELS:
+        raise HTTPException(status_code=400, detail="invalid_digest_channel")
+    if payload.digest_window_seconds < 1 or payload.digest_max_documents < 1:
+        raise HTTPException(status_code=400, detail="invalid_digest_window")
     rule = (
         db.query(models.TenantRule)
         .filter(models.TenantRule.tenant_id == current_user.tenant_id, models.TenantRule.rule_name == "notify:channels")
@@ -241,6 +252,9 @@ def set_notifications(
         "email_webhook_url": payload.email_webhook_url,
         "whatsapp_webhook_url": payload.whatsapp_webhook_url,
         "telegram_webhook_url": payload.telegram_webhook_url,
+        "digest_channels": sorted(set(payload.digest_channels)),
+        "digest_window_seconds": payload.digest_window_seconds,
+        "digest_max_documents": payload.digest_max_documents,
     }
     if rule:
         rule.definition = definition
@@ -253,6 +267,7 @@ def set_notifications(
         )
         db.add(rule)
     db.commit()
+    bump_tenant_config(current_user.tenant_id)
     return {"status": "UPDATED"}
 
 
@@ -264,7 +279,7 @@ def list_document_profiles(
 ):
     items = (
         db.query(models.TenantRule)
-        .filter(models.TenantRule.tenant_id == current_user.tenant_id, models.TenantRule.rule_name.like("profile:%"))
+        .filter(models.TenantRule.tenant_id == current_user.tenant_id, models.TenantRule.kind == "profile")
         .order_by(models.TenantRule.created_at.desc(), models.TenantRule.id.desc())
         .limit(limit)
         .all()
@@ -303,5 +318,6 @@ def add_document_profile(
     )
     db.add(item)
     db.commit()
+    bump_tenant_config(current_user.tenant_id)
     db.refresh(item)
     return {"id": item.id}
@@ -1,46 +1,115 @@
+from datetime import datetime
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from typing import Annotated
 import uuid
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile
 
+from backend.app.adapters.storage.local import StorageLimitExceeded, write_stream
 from backend.app.api.v1.deps import DbDep, get_current_user
+from backend.app.api.v1.pagination import created_between, keyset, paginate, stream_export
+from backend.app.core.config import get_settings
 from backend.app.db import models
+from backend.app.domain.document.service import extract_text_cached
 from backend.app.engines.extractor.engine import ExtractionEngine
 from backend.app.engines.llm_classifier.engine import LLMClassifierEngine
 from backend.app.engines.rules_engine.engine import RulesEngine
 from backend.app.engines.validator.engine import ValidatorEngine
-from backend.app.utils.document_text import extract_text_from_file
 from backend.app.utils.file_types import infer_doc_type
 from backend.app.workers.tasks import process_document
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
+DOCUMENT_COLUMNS = (
+    models.Document.id,
+    models.Document.doc_type,
+    models.Document.status,
+    models.Document.needs_review,
+    models.Document.trace_id,
+    models.Document.created_at,
+)
+
+
+def _document_query(
+    db,
+    tenant_id,
+    cursor: str | None,
+    status: str | None = None,
+    doc_type: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    needs_review: bool | None = None,
+):
+    query = db.query(*DOCUMENT_COLUMNS).filter(models.Document.tenant_id == tenant_id)
+    if status:
+        query = query.filter(models.Document.status == status)
+    if doc_type:
+        query = query.filter(models.Document.doc_type == doc_type)
+    if needs_review is not None:
+        query = query.filter(models.Document.needs_review == needs_review)
+    query = created_between(query, models.Document.created_at, created_from, created_to)
+    return keyset(query, models.Document.created_at, models.Document.id, cursor)
+
+
+def _document_row(i) -> dict:
+    return {
+        "id": str(i.id),
+        "doc_type": i.doc_type,
+        "status": i.status,
+        "needs_review": i.needs_review,
+        "trace_id": i.trace_id,
+        "created_at": i.created_at.isoformat() if i.created_at else None,
+    }
+
+
 @router.get("")
-def list_documents(db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
-    items = db.query(models.Document).filter(models.Document.tenant_id == current_user.tenant_id).all()
-    return [
-        {
-            "id": str(i.id),
-            "doc_type": i.doc_type,
-            "status": i.status,
-            "needs_review": i.needs_review,
-            "trace_id": i.trace_id,
-        }
-        for i in items
-    ]
+def list_documents(
+    db: DbDep,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    status: str | None = None,
+    doc_type: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    query = _document_query(db, current_user.tenant_id, cursor, status, doc_type, created_from, created_to)
+    return paginate(query, response, limit, _document_row)
+
+
+@router.get("/export")
+def export_documents(
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    status: str | None = None,
+    doc_type: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    tenant_id = current_user.tenant_id
+    return stream_export(
+        lambda db, cursor: _document_query(db, tenant_id, cursor, status, doc_type, created_from, created_to),
+        _document_row,
+    )
 
 
 @router.get("/review")
-def list_review(db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
-    items = (
-        db.query(models.Document)
-        .filter(models.Document.tenant_id == current_user.tenant_id, models.Document.needs_review == True)
-        .all()
+def list_review(
+    db: DbDep,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    doc_type: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    query = _document_query(
+        db, current_user.tenant_id, cursor, None, doc_type, created_from, created_to, needs_review=True
     )
-    return [{"id": str(i.id), "status": i.status} for i in items]
+    return paginate(query, response, limit, lambda i: {"id": str(i.id), "status": i.status})
 
 
 @router.post("/{document_id}/process")
@@ -93,11 +162,15 @@ async def test_analyze_document(
 ):
     suffix = Path(file.filename or "upload.bin").suffix or ".bin"
     with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(await file.read())
         tmp_path = tmp.name
 
     try:
-        extracted_text = extract_text_from_file(tmp_path, file.content_type)
+        try:
+            _, sha256 = write_stream(file.file, Path(tmp_path), max_bytes=get_settings().storage_max_attachment_bytes)
+        except StorageLimitExceeded as exc:
+            raise HTTPException(status_code=413, detail="attachment_too_large") from exc
+        text_result = extract_text_cached(db, tmp_path, file.content_type, sha256)
+        extracted_text = text_result.text
         analysis_parts = [
             f"Nome do arquivo: {file.filename or ''}",
             f"Assunto: {subject}",
@@ -138,13 +211,15 @@ async def test_analyze_document(
 
         doc_type = infer_doc_type(file.filename or "upload.bin")
         extraction_errors: list[str] = []
-        try:
-            extraction = extraction_engine.extract(db, current_user.tenant_id, doc_type, analysis_content)
-        except Exception as exc:
-            extraction = {}
-            extraction_errors.append(f"extraction_error:{exc}")
-
         schema = extraction_engine.schema_for(db, current_user.tenant_id, doc_type)
+        extraction = extraction_engine.extract_structured(schema, doc_type, tmp_path, file.filename, file.content_type)
+        if extraction is None:
+            try:
+                extraction = extraction_engine.extract_with_schema(schema, doc_type, analysis_content)
+            except Exception as exc:
+                extraction = {}
+                extraction_errors.append(f"extraction_error:{exc}")
+
         required_fields = schema.get("required", []) if isinstance(schema, dict) else []
         valid, errors = validator.validate(extraction, required_fields=required_fields)
         errors.extend(extraction_errors)
@@ -159,6 +234,9 @@ async def test_analyze_document(
             "filename": file.filename,
             "doc_type": doc_type,
             "text_preview": extracted_text[:1200],
+            "text_truncated": text_result.truncated,
+            "text_pages_covered": text_result.pages_covered,
+            "text_pages_total": text_result.pages_total,
             "classification": classification,
             "extraction": extraction,
             "valid": valid,
@@ -134,3 +134,16 @@ def sync_account(account_id: str, db: DbDep, current_user: Annotated[models.User
         raise HTTPException(status_code=404, detail="account_not_found")
     sync_email_account.delay(str(account.id))
     return {"status": "QUEUED"}
+
+
+@router.post("/{account_id}/backfill")
+def backfill_account(account_id: str, db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
+    account = (
+        db.query(models.EmailAccount)
+        .filter(models.EmailAccount.id == account_id, models.EmailAccount.tenant_id == current_user.tenant_id)
+        .first()
+    )
+    if not account:
+        raise HTTPException(status_code=404, detail="account_not_found")
+    sync_email_account.delay(str(account.id), True)
+    return {"status": "QUEUED"}
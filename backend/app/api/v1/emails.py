@@ -1,27 +1,77 @@
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 
 from backend.app.api.v1.deps import DbDep, get_current_user
+from backend.app.api.v1.pagination import created_between, keyset, paginate, stream_export
 from backend.app.db import models
 from backend.app.workers.tasks import process_email
 
 router = APIRouter(prefix="/emails", tags=["emails"])
 
 
+def _email_query(
+    db,
+    tenant_id,
+    cursor: str | None,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    # Projeção sem body_text: a listagem nunca precisa do corpo.
+    query = db.query(
+        models.Email.id,
+        models.Email.subject,
+        models.Email.sender,
+        models.Email.status,
+        models.Email.trace_id,
+        models.Email.created_at,
+    ).filter(models.Email.tenant_id == tenant_id)
+    if status:
+        query = query.filter(models.Email.status == status)
+    query = created_between(query, models.Email.created_at, created_from, created_to)
+    return keyset(query, models.Email.created_at, models.Email.id, cursor)
+
+
+def _email_row(i) -> dict:
+    return {
+        "id": str(i.id),
+        "subject": i.subject,
+        "sender": i.sender,
+        "status": i.status,
+        "trace_id": i.trace_id,
+        "created_at": i.created_at.isoformat() if i.created_at else None,
+    }
+
+
 @router.get("")
-def list_emails(db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
-    items = db.query(models.Email).filter(models.Email.tenant_id == current_user.tenant_id).all()
-    return [
-        {
-            "id": str(i.id),
-            "subject": i.subject,
-            "sender": i.sender,
-            "status": i.status,
-            "trace_id": i.trace_id,
-        }
-        for i in items
-    ]
+def list_emails(
+    db: DbDep,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    query = _email_query(db, current_user.tenant_id, cursor, status, created_from, created_to)
+    return paginate(query, response, limit, _email_row)
+
+
+@router.get("/export")
+def export_emails(
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    tenant_id = current_user.tenant_id
+    return stream_export(
+        lambda db, cursor: _email_query(db, tenant_id, cursor, status, created_from, created_to),
+        _email_row,
+    )
 
 
 @router.post("/{email_id}/process")
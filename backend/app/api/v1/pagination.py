@@ -0,0 +1,116 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
+
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from backend.app.db.session import SessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+EXPORT_CHUNK_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime | None, item_id) -> str:
+    raw = f"{created_at.isoformat() if created_at else ''}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, item_id = raw.split("|", 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), item_id
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+
+
+def encode_keys(*values) -> str:
+    raw = "|".join(
+        "" if value is None else value.isoformat() if isinstance(value, datetime) else str(value) for value in values
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_keys(cursor: str, count: int) -> list[str]:
+    try:
+        values = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8").split("|")
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+    if len(values) != count:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    return values
+
+
+def _id_value(id_column, item_id: str):
+    return uuid.UUID(item_id) if id_column.type.python_type is uuid.UUID else id_column.type.python_type(item_id)
+
+
+def keyset(query: Query, created_column, id_column, cursor: str | None) -> Query:
+    # Ordem (created_at DESC, id DESC), servida pela varredura reversa de (tenant_id, created_at, id);
+    # a próxima página começa logo depois da última linha entregue. created_at sempre tem default.
+    query = query.order_by(created_column.desc(), id_column.desc())
+    if not cursor:
+        return query
+    created_at, item_id = decode_cursor(cursor)
+    try:
+        last_id = _id_value(id_column, item_id)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+    if created_at is None:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    return query.filter(
+        or_(created_column < created_at, and_(created_column == created_at, id_column < last_id))
+    )
+
+
+def created_between(query: Query, created_column, created_from: datetime | None, created_to: datetime | None) -> Query:
+    if created_from is not None:
+        query = query.filter(created_column >= created_from)
+    if created_to is not None:
+        query = query.filter(created_column < created_to)
+    return query
+
+
+def paginate(query: Query, response: Response, limit: int, serialize: Callable) -> list[dict]:
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return [serialize(row) for row in rows]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_export(build_query: Callable, serialize: Callable) -> StreamingResponse:
+    # A sessão da dependência já foi fechada quando o corpo é transmitido; o export abre a sua
+    # e lê em blocos pelo próprio keyset, sem carregar o resultado inteiro na memória.
+    def generate() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            yield b"["
+            first = True
+            cursor = None
+            while True:
+                rows: Iterable = build_query(db, cursor).limit(EXPORT_CHUNK_SIZE).all()
+                for row in rows:
+                    chunk = json.dumps(serialize(row), ensure_ascii=False, default=_json_default)
+                    yield (chunk if first else "," + chunk).encode("utf-8")
+                    first = False
+                if len(rows) < EXPORT_CHUNK_SIZE:
+                    break
+                cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+            yield b"]"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
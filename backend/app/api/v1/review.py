@@ -1,11 +1,15 @@
 from typing import Annotated
 from datetime import datetime
+import uuid
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy import String, and_, case, cast, literal, or_, select, true
 
 from backend.app.api.v1.deps import DbDep, get_current_user
+from backend.app.api.v1.pagination import NEXT_CURSOR_HEADER, decode_keys, encode_keys
 from backend.app.db import models
+from backend.app.domain.document.service import current_result, set_current_result
 from backend.app.workers.tasks import process_document
 
 router = APIRouter(prefix="/review", tags=["review"])
@@ -19,55 +23,106 @@ class ReviewDecisionPayload(BaseModel):
     extraction: dict | None = None
 
 
+# Ordem da fila: prioridade da última classificação (high primeiro) e, dentro dela, o mais antigo.
+PRIORITY_RANK = {"high": 0, "medium": 1, "normal": 1, "low": 2}
+REVIEW_SORTS = {"priority", "age"}
+
+
 @router.get("")
-def review_queue(db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
-    items = (
-        db.query(models.Document)
-        .filter(models.Document.tenant_id == current_user.tenant_id, models.Document.needs_review == True)
-        .all()
-    )
-    result = []
-    for item in items:
-        classification = (
-            db.query(models.Classification)
-            .filter(models.Classification.document_id == item.id)
-            .order_by(models.Classification.created_at.desc())
-            .first()
+def review_queue(
+    db: DbDep,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    sort: str = "priority",
+):
+    if sort not in REVIEW_SORTS:
+        raise HTTPException(status_code=400, detail="invalid_sort")
+    # Uma consulta só: classificação e extração atuais por chave primária (ponteiros no documento)
+    # e a última dead letter via LATERAL.
+    dl = (
+        select(models.DeadLetter.reason)
+        .where(
+            models.DeadLetter.entity_type == "document",
+            models.DeadLetter.entity_id == cast(models.Document.id, String),
         )
-        extraction = (
-            db.query(models.Extraction)
-            .filter(models.Extraction.document_id == item.id)
-            .order_by(models.Extraction.created_at.desc())
-            .first()
+        .order_by(models.DeadLetter.created_at.desc())
+        .limit(1)
+        .lateral("dl")
+    )
+    cls = models.Classification
+    rank = case(
+        *[(cls.priority == priority, value) for priority, value in PRIORITY_RANK.items()],
+        else_=1,
+    )
+    if sort == "age":
+        rank = literal(0)
+    query = (
+        db.query(
+            models.Document.id,
+            models.Document.status,
+            models.Document.trace_id,
+            models.Document.doc_type,
+            models.Document.created_at,
+            cls.category,
+            cls.department,
+            cls.priority,
+            cls.confidence,
+            cls.reason,
+            cls.source,
+            models.Extraction.data.label("extraction"),
+            dl.c.reason.label("review_reason"),
+            rank.label("rank"),
         )
-        dead_letter = (
-            db.query(models.DeadLetter)
-            .filter(models.DeadLetter.entity_type == "document", models.DeadLetter.entity_id == str(item.id))
-            .order_by(models.DeadLetter.created_at.desc())
-            .first()
+        .outerjoin(cls, cls.id == models.Document.current_classification_id)
+        .outerjoin(models.Extraction, models.Extraction.id == models.Document.current_extraction_id)
+        .outerjoin(dl, true())
+        .filter(models.Document.tenant_id == current_user.tenant_id, models.Document.needs_review == True)
+        .order_by(rank, models.Document.created_at, models.Document.id)
+    )
+    if cursor:
+        last_rank, last_created, last_id = decode_keys(cursor, 3)
+        try:
+            last_rank = int(last_rank)
+            last_created = datetime.fromisoformat(last_created)
+            last_id = uuid.UUID(last_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+        query = query.filter(
+            or_(
+                rank > last_rank,
+                and_(rank == last_rank, models.Document.created_at > last_created),
+                and_(rank == last_rank, models.Document.created_at == last_created, models.Document.id > last_id),
+            )
         )
-        result.append(
-            {
-                "id": str(item.id),
-                "status": item.status,
-                "trace_id": item.trace_id,
-                "doc_type": item.doc_type,
-                "created_at": item.created_at.isoformat() if item.created_at else None,
-                "classification": {
-                    "category": classification.category,
-                    "department": classification.department,
-                    "priority": classification.priority,
-                    "confidence": float(classification.confidence),
-                    "reason": classification.reason,
-                    "source": classification.source,
-                }
-                if classification
-                else None,
-                "extraction": extraction.data if extraction else {},
-                "review_reason": dead_letter.reason if dead_letter else None,
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_keys(last.rank, last.created_at, last.id)
+    return [
+        {
+            "id": str(item.id),
+            "status": item.status,
+            "trace_id": item.trace_id,
+            "doc_type": item.doc_type,
+            "created_at": item.created_at.isoformat() if item.created_at else None,
+            "classification": {
+                "category": item.category,
+                "department": item.department,
+                "priority": item.priority,
+                "confidence": float(item.confidence),
+                "reason": item.reason,
+                "source": item.source,
             }
-        )
-    return result
+            if item.category is not None
+            else None,
+            "extraction": item.extraction or {},
+            "review_reason": item.review_reason,
+        }
+        for item in rows
+    ]
 
 
 @router.post("/{document_id}/approve")
@@ -85,18 +140,7 @@ def approve_review(
     if not item:
         raise HTTPException(status_code=404, detail="document_not_found")
 
-    existing_cls = (
-        db.query(models.Classification)
-        .filter(models.Classification.document_id == item.id)
-        .order_by(models.Classification.created_at.desc())
-        .first()
-    )
-    existing_extraction = (
-        db.query(models.Extraction)
-        .filter(models.Extraction.document_id == item.id)
-        .order_by(models.Extraction.created_at.desc())
-        .first()
-    )
+    existing_cls, existing_extraction = current_result(db, item)
     changed_fields: list[str] = []
     base_category = existing_cls.category if existing_cls else None
     base_department = existing_cls.department if existing_cls else None
@@ -109,6 +153,8 @@ def approve_review(
         changed_fields.append("priority")
     if payload.extraction is not None and payload.extraction != (existing_extraction.data if existing_extraction else {}):
         changed_fields.append("extraction")
+    classification = None
+    extraction = None
     if payload.category or payload.department or payload.priority or payload.reason:
         classification = models.Classification(
             tenant_id=item.tenant_id,
@@ -120,10 +166,10 @@ def approve_review(
             reason=payload.reason or "manual_review_approved",
             source="manual",
         )
-        db.add(classification)
 
     if payload.extraction is not None:
-        db.add(models.Extraction(tenant_id=item.tenant_id, document_id=item.id, data=payload.extraction))
+        extraction = models.Extraction(tenant_id=item.tenant_id, document_id=item.id, data=payload.extraction)
+    set_current_result(db, item, classification, extraction)
 
     item.needs_review = False
     item.status = "DONE"
@@ -172,7 +218,7 @@ def reprocess_review(
         )
     )
     db.commit()
-    process_document.delay(document_id)
+    process_document.delay(document_id, False)
     return {"status": "QUEUED"}
 
 
@@ -1,9 +1,10 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from pydantic import BaseModel
 
 from backend.app.api.v1.deps import DbDep, get_current_user, require_role
+from backend.app.api.v1.pagination import keyset, paginate
 from backend.app.core.security import hash_password
 from backend.app.db import models
 
@@ -42,6 +43,15 @@ def create_user(payload: UserPayload, db: DbDep, current_user: Annotated[models.
 
 
 @router.get("")
-def list_users(db: DbDep, current_user: Annotated[models.User, Depends(get_current_user)]):
-    items = db.query(models.User).filter(models.User.tenant_id == current_user.tenant_id).all()
-    return [{"id": str(u.id), "email": u.email, "full_name": u.full_name} for u in items]
+def list_users(
+    db: DbDep,
+    response: Response,
+    current_user: Annotated[models.User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    query = db.query(models.User.id, models.User.email, models.User.full_name, models.User.created_at).filter(
+        models.User.tenant_id == current_user.tenant_id
+    )
+    query = keyset(query, models.User.created_at, models.User.id, cursor)
+    return paginate(query, response, limit, lambda u: {"id": str(u.id), "email": u.email, "full_name": u.full_name})
@@ -1,3 +1,4 @@
+import os
 from functools import lru_cache
 from pydantic_settings import BaseSettings
 
@@ -16,8 +17,47 @@ class Settings(BaseSettings):
 
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"
+    llm_classify_batch_size: int = 8
+    llm_classify_batch_window_seconds: int = 2
+    llm_classify_processing_timeout_seconds: int = 300
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 30 * 24 * 3600
+    llm_cache_max_entries: int = 100_000
+
+    imap_sync_batch_size: int = 50
+    imap_backfill_batch_size: int = 200
+    sync_lease_seconds: int = 15 * 60
+    sync_enqueue_jitter_seconds: int = 60
+    mailbox_watcher_max_sessions: int = 200
+    mailbox_watcher_idle_seconds: int = 300
+    mailbox_watcher_poll_seconds: int = 30
+    mailbox_watcher_refresh_seconds: int = 60
 
     storage_root: str = "./storage"
+    storage_max_attachment_bytes: int = 25 * 1024 * 1024
+    storage_tenant_quota_bytes: int | None = 10 * 1024 * 1024 * 1024
+    storage_blob_gc_grace_hours: int = 24
+    text_cache_max_bytes: int = 512 * 1024 * 1024
+    extraction_pool_workers: int = max(2, os.cpu_count() or 2)
+    extraction_host_concurrency: int = os.cpu_count() or 2
+    extraction_deadline_seconds: int = 120
+    extraction_max_pages: int = 300
+    extraction_max_ocr_pages: int = 40
+    extraction_local_first: bool = True
+    extraction_local_first_min_coverage: float = 0.5
+    tenant_config_max_age_seconds: int = 300
+    notify_claim_batch_size: int = 200
+    notify_lease_seconds: int = 120
+    notify_poll_seconds: int = 2
+    notify_webhook_timeout_seconds: float = 8.0
+    notify_webhook_batch_size: int = 1
+    notify_max_connections: int = 100
+    notify_per_host_concurrency: int = 4
+    notify_per_host_queue: int = 8
+    notify_max_inflight: int = 100
+    notify_retry_base_seconds: int = 30
+    notify_max_attempts: int = 8
+    notify_document_url: str = ""
     smtp_from: str = "no-reply@epe.local"
 
     class Config:
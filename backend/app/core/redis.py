@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+from redis import Redis
+
+from backend.app.core.config import get_settings
+
+
+@lru_cache
+def get_redis() -> Redis:
+    return Redis.from_url(get_settings().redis_url)
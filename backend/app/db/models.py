@@ -2,9 +2,11 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -62,6 +64,7 @@ class User(Base, TimestampMixin, TenantScopedMixin):
     password_hash: Mapped[str] = mapped_column(String(255))
     full_name: Mapped[str] = mapped_column(String(255))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    __table_args__ = (Index("ix_users_tenant_created", "tenant_id", "created_at", "id"),)
 
 
 class Role(Base, TimestampMixin):
@@ -91,6 +94,21 @@ class EmailAccount(Base, TimestampMixin, TenantScopedMixin):
     use_ssl: Mapped[bool] = mapped_column(Boolean, default=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     last_synced_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    sync_lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class EmailSyncState(Base, TimestampMixin, TenantScopedMixin):
+    __tablename__ = "email_sync_states"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    email_account_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("email_accounts.id"), index=True)
+    folder: Mapped[str] = mapped_column(String(255), default="INBOX")
+    uidvalidity: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    last_uid: Mapped[int] = mapped_column(BigInteger, default=0)
+    highest_modseq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    backfill_before_uid: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    backfill_done: Mapped[bool] = mapped_column(Boolean, default=False)
+    __table_args__ = (UniqueConstraint("email_account_id", "folder", name="uq_email_sync_state_folder"),)
 
 
 class Email(Base, TimestampMixin, TenantScopedMixin):
@@ -104,7 +122,10 @@ class Email(Base, TimestampMixin, TenantScopedMixin):
     body_text: Mapped[str | None] = mapped_column(Text, nullable=True)
     status: Mapped[str] = mapped_column(String(50), default="RECEIVED")
     trace_id: Mapped[str] = mapped_column(String(64), index=True)
-    __table_args__ = (UniqueConstraint("tenant_id", "message_id", name="uq_tenant_message_id"),)
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "message_id", name="uq_tenant_message_id"),
+        Index("ix_emails_tenant_created", "tenant_id", "created_at", "id"),
+    )
 
 
 class EmailAttachment(Base, TimestampMixin, TenantScopedMixin):
@@ -116,6 +137,18 @@ class EmailAttachment(Base, TimestampMixin, TenantScopedMixin):
     file_path: Mapped[str] = mapped_column(Text)
     sha256: Mapped[str] = mapped_column(String(64), index=True)
     mime_type: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+
+class AttachmentBlob(Base, TimestampMixin, TenantScopedMixin):
+    __tablename__ = "attachment_blobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64))
+    file_path: Mapped[str] = mapped_column(Text)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0)
+    __table_args__ = (UniqueConstraint("tenant_id", "sha256", name="uq_attachment_blob_sha256"),)
 
 
 class Document(Base, TimestampMixin, TenantScopedMixin):
@@ -128,6 +161,21 @@ class Document(Base, TimestampMixin, TenantScopedMixin):
     status: Mapped[str] = mapped_column(String(50), default="QUEUED")
     needs_review: Mapped[bool] = mapped_column(Boolean, default=False)
     trace_id: Mapped[str] = mapped_column(String(64), index=True)
+    # Estado atual (última classificação/extração); o histórico continua nas tabelas append-only.
+    current_classification_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("classifications.id", use_alter=True, name="fk_documents_current_classification"),
+        nullable=True,
+    )
+    current_extraction_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("extractions.id", use_alter=True, name="fk_documents_current_extraction"),
+        nullable=True,
+    )
+    __table_args__ = (
+        Index("ix_documents_tenant_created", "tenant_id", "created_at", "id"),
+        Index("ix_documents_tenant_review", "tenant_id", "needs_review", "created_at"),
+    )
 
 
 class Classification(Base, TimestampMixin, TenantScopedMixin):
@@ -171,6 +219,24 @@ class DeadLetter(Base, TimestampMixin, TenantScopedMixin):
     reason: Mapped[str] = mapped_column(Text)
     payload: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     trace_id: Mapped[str] = mapped_column(String(64), index=True)
+    __table_args__ = (Index("ix_dead_letters_entity", "entity_type", "entity_id"),)
+
+
+class NotificationOutbox(Base, TimestampMixin, TenantScopedMixin):
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    document_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id"), nullable=True)
+    channel: Mapped[str] = mapped_column(String(20))
+    target: Mapped[str | None] = mapped_column(Text, nullable=True)
+    payload: Mapped[dict] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(String(20), default="PENDING")
+    digest_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (Index("ix_notification_outbox_due", "status", "next_attempt_at"),)
 
 
 class AuditLog(Base, TimestampMixin, TenantScopedMixin):
@@ -192,13 +258,37 @@ class TenantCategory(Base, TimestampMixin, TenantScopedMixin):
     department: Mapped[str] = mapped_column(String(120), index=True)
 
 
+RULE_KIND_PREFIXES = (
+    ("notify:", "notify"),
+    ("sync:account:", "sync"),
+    ("profile:", "profile"),
+    ("route:", "route"),
+)
+
+
+def rule_kind(rule_name: str | None) -> str:
+    for prefix, kind in RULE_KIND_PREFIXES:
+        if (rule_name or "").startswith(prefix):
+            return kind
+    return "rule"
+
+
+def _default_rule_kind(context) -> str:
+    return rule_kind(context.get_current_parameters().get("rule_name"))
+
+
 class TenantRule(Base, TimestampMixin, TenantScopedMixin):
     __tablename__ = "tenant_rules"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     rule_name: Mapped[str] = mapped_column(String(120))
+    kind: Mapped[str] = mapped_column(String(20), default=_default_rule_kind)
     definition: Mapped[dict] = mapped_column(JSONB)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    __table_args__ = (
+        Index("ix_tenant_rules_tenant_rule_name", "tenant_id", "rule_name"),
+        Index("ix_tenant_rules_tenant_kind", "tenant_id", "kind"),
+    )
 
 
 class TenantPrompt(Base, TimestampMixin, TenantScopedMixin):
@@ -217,3 +307,22 @@ class ExtractionSchema(Base, TimestampMixin, TenantScopedMixin):
     doc_type: Mapped[str] = mapped_column(String(120), index=True)
     schema: Mapped[dict] = mapped_column(JSONB)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+
+
+class ExtractedTextCache(Base, TimestampMixin):
+    __tablename__ = "extracted_text_cache"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64))
+    extractor: Mapped[str] = mapped_column(String(40))
+    extractor_version: Mapped[str] = mapped_column(String(20))
+    max_chars: Mapped[int] = mapped_column(Integer)
+    text: Mapped[str] = mapped_column(Text)
+    size_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    pages_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pages_covered: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    truncated: Mapped[bool] = mapped_column(Boolean, default=False)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+    __table_args__ = (
+        UniqueConstraint("sha256", "extractor", "extractor_version", "max_chars", name="uq_extracted_text_cache_key"),
+    )
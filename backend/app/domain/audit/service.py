@@ -1,3 +1,7 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from backend.app.db import models
@@ -25,3 +29,11 @@ def log_event(
     db.commit()
     db.refresh(item)
     return item
+
+
+def log_events(db: Session, events: list[dict]) -> None:
+    # Inserção em lote sem commit: entra na transação do chamador.
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(models.AuditLog), [{"id": uuid.uuid4(), "created_at": now, **event} for event in events])
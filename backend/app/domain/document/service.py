@@ -1,6 +1,12 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from backend.app.db import models
+from backend.app.utils.document_text import EXTRACTOR_VERSION, TextExtraction, extract_document_text, extractor_for
 from backend.app.utils.file_types import infer_doc_type
 
 
@@ -21,3 +27,121 @@ def create_document_from_attachment(db: Session, tenant_id, email_id, attachment
 
 def list_documents(db: Session, tenant_id):
     return db.query(models.Document).filter(models.Document.tenant_id == tenant_id).all()
+
+
+def find_processed_duplicate(db: Session, tenant_id, sha256: str, doc_type: str | None, exclude_document_id):
+    # Reaproveita o resultado de outro documento com o mesmo conteúdo (mesmo SHA-256) já concluído.
+    doc = (
+        db.query(models.Document)
+        .join(models.EmailAttachment, models.EmailAttachment.id == models.Document.attachment_id)
+        .filter(
+            models.Document.tenant_id == tenant_id,
+            models.Document.id != exclude_document_id,
+            models.Document.doc_type == doc_type if doc_type is not None else models.Document.doc_type.is_(None),
+            models.Document.status == "DONE",
+            models.Document.needs_review == False,
+            models.EmailAttachment.sha256 == sha256,
+        )
+        .order_by(models.Document.updated_at.desc().nullslast())
+        .first()
+    )
+    if not doc:
+        return None
+    classification, extraction = current_result(db, doc)
+    if not classification or not extraction:
+        return None
+    return classification, extraction
+
+
+def current_result(
+    db: Session, doc: models.Document
+) -> tuple[models.Classification | None, models.Extraction | None]:
+    # Leitura por chave primária via os ponteiros de estado atual do documento.
+    classification = (
+        db.get(models.Classification, doc.current_classification_id) if doc.current_classification_id else None
+    )
+    extraction = db.get(models.Extraction, doc.current_extraction_id) if doc.current_extraction_id else None
+    return classification, extraction
+
+
+def set_current_result(
+    db: Session,
+    doc: models.Document,
+    classification: models.Classification | None = None,
+    extraction: models.Extraction | None = None,
+) -> None:
+    # Grava a nova versão no histórico e aponta o documento para ela, sem commit: entra na transação
+    # do chamador. O flush antes de apontar garante a ordem dos INSERTs em relação às FKs.
+    for item in (classification, extraction):
+        if item is not None:
+            db.add(item)
+    db.flush()
+    if classification is not None:
+        doc.current_classification_id = classification.id
+    if extraction is not None:
+        doc.current_extraction_id = extraction.id
+
+
+def extract_text_cached(
+    db: Session,
+    file_path: str,
+    mime_type: str | None,
+    sha256: str | None,
+    max_chars: int = 20000,
+    filename: str | None = None,
+) -> TextExtraction:
+    if not sha256 or not Path(file_path).is_file():
+        return extract_document_text(file_path, mime_type, max_chars=max_chars, filename=filename)
+
+    extractor = extractor_for(file_path, mime_type, filename)
+    cached = (
+        db.query(models.ExtractedTextCache)
+        .filter(
+            models.ExtractedTextCache.sha256 == sha256,
+            models.ExtractedTextCache.extractor == extractor,
+            models.ExtractedTextCache.extractor_version == EXTRACTOR_VERSION,
+            models.ExtractedTextCache.max_chars == max_chars,
+        )
+        .first()
+    )
+    now = datetime.utcnow()
+    if cached:
+        # Evita uma escrita por acerto: só renova o uso quando a marca estiver velha.
+        if not cached.last_used_at or cached.last_used_at.replace(tzinfo=None) < now - timedelta(hours=1):
+            cached.last_used_at = now
+        return TextExtraction(cached.text, cached.pages_total, cached.pages_covered, bool(cached.truncated))
+
+    result = extract_document_text(file_path, mime_type, max_chars=max_chars, filename=filename)
+    # Texto vazio pode ser falha transitória (timeout do OCR); não fica em cache.
+    if result.text:
+        stmt = insert(models.ExtractedTextCache).values(
+            sha256=sha256,
+            extractor=extractor,
+            extractor_version=EXTRACTOR_VERSION,
+            max_chars=max_chars,
+            text=result.text,
+            size_bytes=len(result.text.encode("utf-8")),
+            pages_total=result.pages_total,
+            pages_covered=result.pages_covered,
+            truncated=result.truncated,
+            last_used_at=now,
+            created_at=now,
+        )
+        db.execute(stmt.on_conflict_do_nothing(constraint="uq_extracted_text_cache_key"))
+    return result
+
+
+def evict_text_cache(db: Session, max_bytes: int) -> int:
+    running = select(
+        models.ExtractedTextCache.id,
+        func.sum(models.ExtractedTextCache.size_bytes)
+        .over(order_by=(models.ExtractedTextCache.last_used_at.desc(), models.ExtractedTextCache.id.desc()))
+        .label("running_bytes"),
+    ).subquery()
+    result = db.execute(
+        delete(models.ExtractedTextCache).where(
+            models.ExtractedTextCache.id.in_(select(running.c.id).where(running.c.running_bytes > max_bytes))
+        )
+    )
+    db.commit()
+    return result.rowcount or 0
@@ -1,9 +1,14 @@
 import uuid
 from datetime import datetime, timedelta
 
+from sqlalchemy import Integer, String, and_, case, cast, func, insert, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from backend.app.db import models
+from backend.app.domain.audit.service import log_events
+from backend.app.domain.storage.service import acquire_blobs
+from backend.app.domain.tenant_config.service import bump_tenant_config
 from backend.app.utils.crypto import encrypt_secret
 
 
@@ -51,6 +56,7 @@ def set_account_sync_interval(db: Session, tenant_id, account_id, interval_minut
         )
         db.add(rule)
     db.commit()
+    bump_tenant_config(tenant_id)
 
 
 def get_account_sync_interval(db: Session, tenant_id, account_id, default_minutes: int = 5) -> int:
@@ -67,67 +73,202 @@ def get_account_sync_interval(db: Session, tenant_id, account_id, default_minute
         return default_minutes
 
 
-def account_sync_due(account: models.EmailAccount, interval_minutes: int) -> bool:
-    if not account.last_synced_at:
-        return True
-    next_sync = account.last_synced_at + timedelta(minutes=interval_minutes)
-    return datetime.utcnow() >= next_sync.replace(tzinfo=None)
+def claim_due_accounts(db: Session, lease_seconds: int, default_minutes: int = 5) -> tuple[list[str], datetime]:
+    # Seleciona as contas vencidas (intervalo vindo do join indexado em tenant_rules) e grava o lease
+    # no mesmo UPDATE: ticks sobrepostos do beat ou várias instâncias não enfileiram a conta duas vezes.
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    # Valor fora do formato (escrito direto em /configs/rules) cai no padrão em vez de abortar o
+    # tick inteiro com erro de cast.
+    raw_interval = models.TenantRule.definition["interval_minutes"].astext
+    interval_minutes = case(
+        (raw_interval.op("~")(r"^\s*[0-9]{1,6}\s*$"), cast(func.trim(raw_interval), Integer)),
+        else_=default_minutes,
+    )
+    due = (
+        select(models.EmailAccount.id)
+        .outerjoin(
+            models.TenantRule,
+            and_(
+                models.TenantRule.tenant_id == models.EmailAccount.tenant_id,
+                models.TenantRule.kind == "sync",
+                models.TenantRule.rule_name == func.concat("sync:account:", cast(models.EmailAccount.id, String)),
+            ),
+        )
+        .where(
+            models.EmailAccount.is_active == True,
+            or_(models.EmailAccount.sync_lease_until.is_(None), models.EmailAccount.sync_lease_until <= now),
+            or_(
+                models.EmailAccount.last_synced_at.is_(None),
+                models.EmailAccount.last_synced_at + interval_minutes * literal_column("interval '1 minute'") <= now,
+            ),
+        )
+        .with_for_update(of=models.EmailAccount, skip_locked=True)
+    )
+    stmt = (
+        update(models.EmailAccount)
+        .where(models.EmailAccount.id.in_(due.scalar_subquery()))
+        .values(sync_lease_until=lease_until)
+        .returning(models.EmailAccount.id)
+        .execution_options(synchronize_session=False)
+    )
+    account_ids = [str(row[0]) for row in db.execute(stmt)]
+    db.commit()
+    return account_ids, lease_until
 
 
-def create_email_if_missing(db: Session, tenant_id, account_id, payload: dict) -> models.Email | None:
-    exists = (
-        db.query(models.Email)
-        .filter(models.Email.tenant_id == tenant_id, models.Email.message_id == payload["message_id"])
-        .first()
+def release_sync_lease(db: Session, account_id, lease_until: datetime) -> None:
+    # Só libera o lease gravado por esta reserva; um lease renovado pelo mailbox_watcher fica intacto.
+    db.execute(
+        update(models.EmailAccount)
+        .where(models.EmailAccount.id == account_id, models.EmailAccount.sync_lease_until == lease_until)
+        .values(sync_lease_until=None)
+        .execution_options(synchronize_session=False)
     )
-    if exists:
-        return None
-    item = models.Email(
-        tenant_id=tenant_id,
-        email_account_id=account_id,
-        message_id=payload["message_id"],
-        subject=payload.get("subject"),
-        sender=payload.get("sender"),
-        body_text=payload.get("body_text"),
-        status="RECEIVED",
-        trace_id=payload.get("trace_id", uuid.uuid4().hex),
-    )
-    db.add(item)
     db.commit()
-    db.refresh(item)
-    return item
-
-
-def create_email_attachment(
-    db: Session,
-    tenant_id,
-    email_id,
-    filename: str,
-    mime_type: str | None,
-    file_path: str,
-    sha256: str,
-) -> models.EmailAttachment:
-    existing = (
-        db.query(models.EmailAttachment)
-        .filter(
-            models.EmailAttachment.tenant_id == tenant_id,
-            models.EmailAttachment.email_id == email_id,
-            models.EmailAttachment.sha256 == sha256,
-        )
-        .first()
+
+
+def existing_message_ids(db: Session, tenant_id, message_ids: list[str]) -> set[str]:
+    if not message_ids:
+        return set()
+    rows = (
+        db.query(models.Email.message_id)
+        .filter(models.Email.tenant_id == tenant_id, models.Email.message_id.in_(set(message_ids)))
+        .all()
     )
-    if existing:
-        return existing
+    return {row[0] for row in rows}
 
-    item = models.EmailAttachment(
+
+def ingest_messages(db: Session, tenant_id, account_id, messages: list[dict]) -> list[dict]:
+    # Grava um lote do sync sem commit: e-mails, anexos, refs de blob e auditoria entram na transação
+    # do chamador. Cada mensagem traz message_id, subject, sender, body_text, trace_id e `attachments`
+    # (filename, mime_type, file_path, sha256, size_bytes); devolve só as inseridas, com `id`.
+    unique: dict[str, dict] = {}
+    for message in messages:
+        unique.setdefault(message["message_id"], message)
+    # O chamador já filtrou com existing_message_ids; corridas com outro sync caem no ON CONFLICT.
+    pending = list(unique.values())
+    if not pending:
+        return []
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "tenant_id": tenant_id,
+            "email_account_id": account_id,
+            "message_id": message["message_id"],
+            "subject": message.get("subject"),
+            "sender": message.get("sender"),
+            "body_text": message.get("body_text"),
+            "status": "RECEIVED",
+            "trace_id": message.get("trace_id") or uuid.uuid4().hex,
+            "created_at": now,
+        }
+        for message in pending
+    ]
+    stmt = (
+        pg_insert(models.Email)
+        .values(rows)
+        .on_conflict_do_nothing(constraint="uq_tenant_message_id")
+        .returning(models.Email.id, models.Email.message_id)
+    )
+    inserted_ids = {message_id: email_id for email_id, message_id in db.execute(stmt)}
+    if not inserted_ids:
+        return []
+
+    trace_ids = {row["message_id"]: row["trace_id"] for row in rows}
+    inserted: list[dict] = []
+    attachments: list[dict] = []
+    blobs: dict[str, list] = {}
+    for message in pending:
+        email_id = inserted_ids.get(message["message_id"])
+        if email_id is None:
+            continue
+        inserted.append({**message, "id": email_id, "trace_id": trace_ids[message["message_id"]]})
+        seen: set[str] = set()
+        for attachment in message.get("attachments", []):
+            if attachment["sha256"] in seen:
+                continue
+            seen.add(attachment["sha256"])
+            attachments.append(
+                {
+                    "id": uuid.uuid4(),
+                    "tenant_id": tenant_id,
+                    "email_id": email_id,
+                    "filename": attachment["filename"],
+                    "file_path": attachment["file_path"],
+                    "sha256": attachment["sha256"],
+                    "mime_type": attachment.get("mime_type"),
+                    "size_bytes": attachment.get("size_bytes"),
+                    "created_at": now,
+                }
+            )
+            blob = blobs.setdefault(
+                attachment["sha256"], [attachment["sha256"], attachment["file_path"], attachment.get("size_bytes") or 0, 0]
+            )
+            blob[3] += 1
+    if attachments:
+        db.execute(insert(models.EmailAttachment), attachments)
+        acquire_blobs(db, tenant_id, [tuple(blob) for blob in blobs.values()])
+    log_events(
+        db,
+        [
+            {
+                "tenant_id": tenant_id,
+                "trace_id": item["trace_id"],
+                "event_type": "ingestao",
+                "entity_type": "email",
+                "entity_id": str(item["id"]),
+                "payload": {"message_id": item["message_id"]},
+            }
+            for item in inserted
+        ],
+    )
+    return inserted
+
+
+def get_sync_state(db: Session, tenant_id, account_id, folder: str = "INBOX") -> models.EmailSyncState:
+    state = (
+        db.query(models.EmailSyncState)
+        .filter(models.EmailSyncState.email_account_id == account_id, models.EmailSyncState.folder == folder)
+        .first()
+    )
+    if state:
+        return state
+    state = models.EmailSyncState(
         tenant_id=tenant_id,
-        email_id=email_id,
-        filename=filename,
-        file_path=file_path,
-        sha256=sha256,
-        mime_type=mime_type,
+        email_account_id=account_id,
+        folder=folder,
+        last_uid=0,
+        backfill_done=False,
     )
-    db.add(item)
+    db.add(state)
     db.commit()
-    db.refresh(item)
-    return item
+    db.refresh(state)
+    return state
+
+
+def apply_sync_plan(state: models.EmailSyncState, plan: dict, backfill: bool = False) -> None:
+    if plan.get("reset"):
+        state.uidvalidity = plan.get("uidvalidity")
+        state.last_uid = 0
+        state.highest_modseq = None
+        state.backfill_before_uid = None
+        state.backfill_done = False
+
+    uids = plan.get("uids") or []
+    if uids:
+        if not state.last_uid:
+            state.last_uid = max(uids)
+        if backfill or state.backfill_before_uid is None:
+            state.backfill_before_uid = min(uids)
+        if not backfill:
+            state.last_uid = max(state.last_uid, max(uids))
+
+    if backfill:
+        if not plan.get("has_more"):
+            state.backfill_done = True
+    elif not plan.get("has_more"):
+        state.highest_modseq = plan.get("highest_modseq")
+    state.updated_at = datetime.utcnow()
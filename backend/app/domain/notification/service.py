@@ -0,0 +1,289 @@
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, func, or_, update
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.domain.routing.service import route_for_classification
+from backend.app.domain.routing.table import normalize_priority
+from backend.app.domain.tenant_config.service import get_tenant_config
+
+
+def document_notifications(db: Session, doc: models.Document, category: str, priority: str, extracted: dict) -> list[dict]:
+    routing = route_for_classification(db, doc.tenant_id, doc.doc_type or "generic_document", category, priority)
+    channels = get_tenant_config(db, doc.tenant_id).notification_channels
+    notify_emails = routing.get("emails", []) if routing else []
+    all_notify_emails = sorted(set((notify_emails or []) + (channels.get("emails") or [])))
+    subject = f"Novo documento {category}"
+    body = f"Documento {doc.id} prioridade {priority}"
+    message = f"Novo documento {category} ({doc.doc_type}) prioridade {priority}"
+
+    items: list[dict] = []
+    if all_notify_emails:
+        items.append({"channel": "email", "payload": {"recipients": all_notify_emails, "subject": subject, "body": body}})
+    if channels.get("email_webhook_url"):
+        items.append(
+            {
+                "channel": "webhook",
+                "target": channels["email_webhook_url"],
+                "payload": {
+                    "channel": "email",
+                    "recipients": all_notify_emails,
+                    "subject": subject,
+                    "message": body,
+                    "document_id": str(doc.id),
+                    "trace_id": doc.trace_id,
+                },
+            }
+        )
+    if channels.get("whatsapp_numbers"):
+        items.append({"channel": "whatsapp", "payload": {"numbers": channels["whatsapp_numbers"], "message": message}})
+    if channels.get("whatsapp_webhook_url"):
+        items.append(
+            {
+                "channel": "webhook",
+                "target": channels["whatsapp_webhook_url"],
+                "payload": {
+                    "channel": "whatsapp",
+                    "numbers": channels.get("whatsapp_numbers", []),
+                    "message": message,
+                    "document_id": str(doc.id),
+                    "trace_id": doc.trace_id,
+                },
+            }
+        )
+    if channels.get("telegram_users"):
+        items.append({"channel": "telegram", "payload": {"users": channels["telegram_users"], "message": message}})
+    if channels.get("telegram_webhook_url"):
+        items.append(
+            {
+                "channel": "webhook",
+                "target": channels["telegram_webhook_url"],
+                "payload": {
+                    "channel": "telegram",
+                    "users": channels.get("telegram_users", []),
+                    "message": message,
+                    "document_id": str(doc.id),
+                    "trace_id": doc.trace_id,
+                },
+            }
+        )
+    if routing and routing.get("webhook_url"):
+        items.append(
+            {
+                "channel": "webhook",
+                "target": routing["webhook_url"],
+                "payload": {
+                    "document_id": str(doc.id),
+                    "trace_id": doc.trace_id,
+                    "doc_type": doc.doc_type,
+                    "category": category,
+                    "priority": priority,
+                    "needs_review": doc.needs_review,
+                    "extraction": extracted,
+                },
+            }
+        )
+    return items
+
+
+def _digest_key(channel: str, payload: dict) -> str:
+    audience = payload.get("recipients") or payload.get("numbers") or payload.get("users") or []
+    raw = json.dumps([channel, sorted(audience)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def enqueue_document_notifications(
+    db: Session, doc: models.Document, category: str, priority: str, extracted: dict
+) -> int:
+    # Sem commit: as linhas do outbox entram na mesma transação que grava o resultado do documento.
+    now = datetime.utcnow()
+    channels = get_tenant_config(db, doc.tenant_id).notification_channels
+    digest_channels = set(channels.get("digest_channels") or [])
+    # Prioridade alta nunca espera o resumo.
+    urgent = normalize_priority(priority) == "high"
+    items = document_notifications(db, doc, category, priority, extracted)
+    for item in items:
+        payload = item["payload"]
+        status, digest_key, next_attempt_at = "PENDING", None, now
+        if item["channel"] in digest_channels and not urgent:
+            status = "DIGEST"
+            digest_key = _digest_key(item["channel"], payload)
+            next_attempt_at = now + timedelta(seconds=int(channels.get("digest_window_seconds") or 60))
+            payload = {
+                **payload,
+                "document": {"id": str(doc.id), "doc_type": doc.doc_type, "category": category, "priority": priority},
+                "digest_max_documents": int(channels.get("digest_max_documents") or 1),
+            }
+        db.add(
+            models.NotificationOutbox(
+                tenant_id=doc.tenant_id,
+                document_id=doc.id,
+                channel=item["channel"],
+                target=item.get("target"),
+                payload=payload,
+                status=status,
+                digest_key=digest_key,
+                attempts=0,
+                next_attempt_at=next_attempt_at,
+                created_at=now,
+            )
+        )
+    return len(items)
+
+
+def _digest_payload(channel: str, rows: list[models.NotificationOutbox]) -> dict:
+    documents = [row.payload.get("document") or {} for row in rows]
+    counts = Counter(item.get("category") or "-" for item in documents)
+    summary = ", ".join(f"{category}: {count}" for category, count in counts.most_common())
+    link_template = get_settings().notify_document_url
+    lines = []
+    for item in documents:
+        line = f"- {item.get('category')} ({item.get('doc_type')}) prioridade {item.get('priority')}"
+        if link_template:
+            line += f" {link_template.format(document_id=item.get('id'))}"
+        lines.append(line)
+    title = f"{len(rows)} novos documentos ({summary})"
+    message = "\n".join([title, *lines])
+    first = rows[0].payload
+    if channel == "email":
+        return {"recipients": first.get("recipients", []), "subject": title, "body": message}
+    if channel == "whatsapp":
+        return {"numbers": first.get("numbers", []), "message": message}
+    return {"users": first.get("users", []), "message": message}
+
+
+def flush_digests(db: Session) -> int:
+    # Um grupo (tenant, canal, destinatários) sai quando a janela do mais antigo vence ou quando
+    # atinge o número máximo de documentos configurado.
+    now = datetime.utcnow()
+    outbox = models.NotificationOutbox
+    groups = (
+        db.query(outbox.tenant_id, outbox.channel, outbox.digest_key)
+        .filter(outbox.status == "DIGEST")
+        .group_by(outbox.tenant_id, outbox.channel, outbox.digest_key)
+        .having(
+            or_(
+                func.min(outbox.next_attempt_at) <= now,
+                func.count(outbox.id) >= func.max(outbox.payload["digest_max_documents"].astext.cast(Integer)),
+            )
+        )
+        .all()
+    )
+    flushed = 0
+    for tenant_id, channel, digest_key in groups:
+        rows = (
+            db.query(outbox)
+            .filter(
+                outbox.tenant_id == tenant_id,
+                outbox.channel == channel,
+                outbox.digest_key == digest_key,
+                outbox.status == "DIGEST",
+            )
+            .order_by(outbox.id)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            continue
+        db.add(
+            outbox(
+                tenant_id=tenant_id,
+                document_id=None,
+                channel=channel,
+                payload=_digest_payload(channel, rows),
+                status="PENDING",
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+            )
+        )
+        for row in rows:
+            row.status = "DIGESTED"
+        db.commit()
+        flushed += 1
+    return flushed
+
+
+def claim_notifications(db: Session, limit: int, lease_seconds: int) -> list[dict]:
+    # Empurra next_attempt_at para frente ao reservar: se o dispatcher morrer, a linha volta sozinha.
+    # Os dicts são montados antes do commit, que expira as linhas (evita um SELECT por linha).
+    now = datetime.utcnow()
+    leased_until = now + timedelta(seconds=lease_seconds)
+    rows = (
+        db.query(models.NotificationOutbox)
+        .filter(
+            models.NotificationOutbox.status == "PENDING",
+            or_(models.NotificationOutbox.next_attempt_at.is_(None), models.NotificationOutbox.next_attempt_at <= now),
+        )
+        .order_by(models.NotificationOutbox.next_attempt_at, models.NotificationOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for row in rows:
+        row.next_attempt_at = leased_until
+        claimed.append(
+            {"id": row.id, "channel": row.channel, "target": row.target, "payload": row.payload, "leased_until": leased_until}
+        )
+    db.commit()
+    return claimed
+
+
+def _move_lease(db: Session, ids: list[int], leased_until: datetime, next_attempt_at: datetime) -> list[int]:
+    # Só mexe nas linhas cujo lease ainda é o desta reserva: se outra instância já as reservou de novo
+    # (lease vencido), o valor mudou e elas ficam de fora.
+    if not ids:
+        return []
+    rows = db.execute(
+        update(models.NotificationOutbox)
+        .where(
+            models.NotificationOutbox.id.in_(ids),
+            models.NotificationOutbox.status == "PENDING",
+            models.NotificationOutbox.next_attempt_at == leased_until,
+        )
+        .values(next_attempt_at=next_attempt_at)
+        .returning(models.NotificationOutbox.id)
+        .execution_options(synchronize_session=False)
+    )
+    owned = [row[0] for row in rows]
+    db.commit()
+    return owned
+
+
+def renew_lease(db: Session, ids: list[int], leased_until: datetime, lease_seconds: int) -> list[int]:
+    # Renovado logo antes do envio: o tempo de espera na fila do host não consome o lease do envio.
+    return _move_lease(db, ids, leased_until, datetime.utcnow() + timedelta(seconds=lease_seconds))
+
+
+def release_notifications(db: Session, ids: list[int], leased_until: datetime, delay_seconds: float) -> None:
+    _move_lease(db, ids, leased_until, datetime.utcnow() + timedelta(seconds=delay_seconds))
+
+
+def mark_sent(db: Session, ids: list[int]) -> None:
+    if not ids:
+        return
+    db.query(models.NotificationOutbox).filter(models.NotificationOutbox.id.in_(ids)).update(
+        {"status": "SENT", "sent_at": datetime.utcnow(), "last_error": None}, synchronize_session=False
+    )
+    db.commit()
+
+
+def mark_failed(db: Session, ids: list[int], error: str, base_seconds: int, max_attempts: int) -> None:
+    if not ids:
+        return
+    now = datetime.utcnow()
+    for row in db.query(models.NotificationOutbox).filter(models.NotificationOutbox.id.in_(ids)).all():
+        row.attempts = (row.attempts or 0) + 1
+        row.last_error = error[:2000]
+        if row.attempts >= max_attempts:
+            row.status = "FAILED"
+        else:
+            # Backoff exponencial, limitado a 1 h entre tentativas.
+            row.next_attempt_at = now + timedelta(seconds=min(base_seconds * 2 ** (row.attempts - 1), 3600))
+    db.commit()
@@ -0,0 +1,42 @@
+from itertools import product
+
+ANY = object()
+
+
+def normalize_priority(priority) -> str:
+    value = (priority or "").lower()
+    return "medium" if value == "normal" else value
+
+
+class RoutingTable:
+    """Rotas de um tenant indexadas por (doc_type, category, priority), com curinga por campo.
+
+    Cada combinação guarda só a primeira regra na ordem de `routes`; a consulta testa as 8
+    combinações (da mais específica à mais genérica) e devolve a de menor posição, o que equivale
+    a percorrer a lista e parar no primeiro match.
+    """
+
+    def __init__(self, routes: list[dict] | None = None):
+        self._index: dict[tuple, tuple[int, dict]] = {}
+        for position, definition in enumerate(routes or []):
+            key = (
+                definition.get("doc_type") or ANY,
+                definition.get("category") or ANY,
+                normalize_priority(definition.get("priority")) or ANY,
+            )
+            try:
+                self._index.setdefault(key, (position, definition))
+            except TypeError:
+                # Valor não-hashable (ex.: lista) nunca é igual a um doc_type/category textual.
+                continue
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def match(self, doc_type: str, category: str, priority: str) -> dict | None:
+        best = None
+        for key in product((doc_type, ANY), (category, ANY), (normalize_priority(priority), ANY)):
+            hit = self._index.get(key)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return best[1] if best else None
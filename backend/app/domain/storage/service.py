@@ -0,0 +1,96 @@
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.app.adapters.storage.local import TMP_PREFIX, LocalStorageAdapter
+from backend.app.db import models
+
+
+def acquire_blobs(db: Session, tenant_id, blobs: list[tuple[str, str, int, int]]) -> None:
+    # (sha256, file_path, size_bytes, referências); um sha256 por linha, senão o ON CONFLICT
+    # tentaria atualizar a mesma linha duas vezes no mesmo INSERT.
+    if not blobs:
+        return
+    now = datetime.utcnow()
+    stmt = insert(models.AttachmentBlob).values(
+        [
+            {
+                "tenant_id": tenant_id,
+                "sha256": sha256,
+                "file_path": file_path,
+                "size_bytes": size_bytes,
+                "ref_count": refs,
+                "created_at": now,
+            }
+            for sha256, file_path, size_bytes, refs in blobs
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_attachment_blob_sha256",
+        set_={
+            "ref_count": models.AttachmentBlob.ref_count + stmt.excluded.ref_count,
+            "file_path": stmt.excluded.file_path,
+            "updated_at": now,
+        },
+    )
+    db.execute(stmt)
+
+
+def tenant_storage_used(db: Session, tenant_id) -> int:
+    total = (
+        db.query(func.coalesce(func.sum(models.AttachmentBlob.size_bytes), 0))
+        .filter(models.AttachmentBlob.tenant_id == tenant_id, models.AttachmentBlob.ref_count > 0)
+        .scalar()
+    )
+    return int(total or 0)
+
+
+def recount_blob_references(db: Session) -> None:
+    refs = (
+        select(func.count(models.EmailAttachment.id))
+        .where(
+            models.EmailAttachment.tenant_id == models.AttachmentBlob.tenant_id,
+            models.EmailAttachment.sha256 == models.AttachmentBlob.sha256,
+        )
+        .scalar_subquery()
+    )
+    db.execute(update(models.AttachmentBlob).values(ref_count=refs))
+    db.commit()
+
+
+def collect_garbage(db: Session, grace_hours: int, storage: LocalStorageAdapter | None = None) -> int:
+    storage = storage or LocalStorageAdapter()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    recount_blob_references(db)
+
+    removed = 0
+    blobs = (
+        db.query(models.AttachmentBlob)
+        .filter(models.AttachmentBlob.ref_count <= 0)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for blob in blobs:
+        path = Path(blob.file_path)
+        if path.exists() and datetime.utcfromtimestamp(path.stat().st_mtime) > cutoff:
+            continue
+        db.delete(blob)
+        storage.remove(blob.file_path)
+        removed += 1
+    db.commit()
+
+    # Arquivos sem registro (ex.: worker interrompido antes do commit) e temporários esquecidos.
+    known = {row[0] for row in db.query(models.AttachmentBlob.file_path).all()}
+    for path in storage.iter_blob_files():
+        if str(path) in known:
+            continue
+        if datetime.utcfromtimestamp(path.stat().st_mtime) > cutoff:
+            continue
+        if path.name.startswith(TMP_PREFIX) or len(path.name) == 64:
+            os.unlink(path)
+            removed += 1
+    return removed
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+from backend.app.db import models
+from backend.app.domain.routing.table import RoutingTable
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = "tenant_config:version"
+
+NOTIFY_CHANNELS_RULE = "notify:channels"
+SYNC_RULE_PREFIX = "sync:account:"
+DEFAULT_DIGEST_WINDOW_SECONDS = 60
+DEFAULT_DIGEST_MAX_DOCUMENTS = 50
+ROUTING_KEYS = ("doc_type", "category", "priority", "emails", "webhook_url")
+
+
+@dataclass(frozen=True)
+class PlanLimits:
+    name: str
+    monthly_email_limit: int | None
+    monthly_llm_calls_limit: int | None
+
+
+@dataclass
+class TenantConfig:
+    tenant_id: str
+    version: int
+    loaded_at: float
+    plan: PlanLimits | None = None
+    schemas: dict[str, dict] = field(default_factory=dict)
+    routes: list[dict] = field(default_factory=list)
+    routing: RoutingTable = field(default_factory=RoutingTable)
+    notification_channels: dict = field(default_factory=dict)
+    profiles: list[dict] = field(default_factory=list)
+    sync_intervals: dict[str, dict] = field(default_factory=dict)
+
+    def schema_for(self, doc_type: str, default: dict) -> dict:
+        return self.schemas.get(doc_type, default)
+
+    def sync_interval(self, account_id, default_minutes: int = 5) -> int:
+        definition = self.sync_intervals.get(str(account_id))
+        if not definition:
+            return default_minutes
+        try:
+            return int(definition.get("interval_minutes", default_minutes))
+        except Exception:
+            return default_minutes
+
+
+_snapshots: dict[str, TenantConfig] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _version_key(tenant_id) -> str:
+    return f"{VERSION_KEY_PREFIX}:{tenant_id}"
+
+
+def notification_channels(definition: dict | None) -> dict:
+    definition = definition or {}
+    return {
+        "emails": definition.get("emails", []),
+        "whatsapp_numbers": definition.get("whatsapp_numbers", []),
+        "telegram_users": definition.get("telegram_users", []),
+        "email_webhook_url": definition.get("email_webhook_url"),
+        "whatsapp_webhook_url": definition.get("whatsapp_webhook_url"),
+        "telegram_webhook_url": definition.get("telegram_webhook_url"),
+        "digest_channels": definition.get("digest_channels", []),
+        "digest_window_seconds": definition.get("digest_window_seconds", DEFAULT_DIGEST_WINDOW_SECONDS),
+        "digest_max_documents": definition.get("digest_max_documents", DEFAULT_DIGEST_MAX_DOCUMENTS),
+    }
+
+
+def current_version(tenant_id) -> int | None:
+    try:
+        raw = get_redis().get(_version_key(tenant_id))
+    except RedisError as exc:
+        logger.warning("tenant_config_version_unavailable error=%s", exc)
+        return None
+    return int(raw) if raw is not None else 0
+
+
+def bump_tenant_config(tenant_id) -> None:
+    # Chamado depois do commit de qualquer escrita em configuração: os workers recarregam o snapshot
+    # na próxima leitura. Sem Redis, o snapshot expira por TENANT_CONFIG_MAX_AGE_SECONDS.
+    with _snapshots_lock:
+        _snapshots.pop(str(tenant_id), None)
+    try:
+        get_redis().incr(_version_key(tenant_id))
+    except RedisError as exc:
+        logger.warning("tenant_config_version_unavailable error=%s", exc)
+
+
+def load_tenant_config(db: Session, tenant_id, version: int = 0) -> TenantConfig:
+    config = TenantConfig(tenant_id=str(tenant_id), version=version, loaded_at=time.monotonic())
+
+    tenant_exists = db.query(models.Tenant.id).filter(models.Tenant.id == tenant_id).first() is not None
+    if tenant_exists:
+        plan = db.query(models.Plan).filter(models.Plan.name == "Starter").first()
+        if plan:
+            config.plan = PlanLimits(
+                name=plan.name,
+                monthly_email_limit=plan.monthly_email_limit,
+                monthly_llm_calls_limit=plan.monthly_llm_calls_limit,
+            )
+
+    schemas = (
+        db.query(models.ExtractionSchema.doc_type, models.ExtractionSchema.schema)
+        .filter(models.ExtractionSchema.tenant_id == tenant_id, models.ExtractionSchema.is_active == True)
+        .order_by(models.ExtractionSchema.id)
+        .all()
+    )
+    for doc_type, schema in schemas:
+        config.schemas.setdefault(doc_type, schema)
+
+    rules = (
+        db.query(models.TenantRule.rule_name, models.TenantRule.kind, models.TenantRule.definition, models.TenantRule.is_active)
+        .filter(models.TenantRule.tenant_id == tenant_id)
+        .order_by(models.TenantRule.id)
+        .all()
+    )
+    channels = None
+    for rule_name, kind, definition, is_active in rules:
+        definition = definition or {}
+        if rule_name == NOTIFY_CHANNELS_RULE:
+            if channels is None:
+                channels = definition
+        elif kind == "sync":
+            config.sync_intervals.setdefault(rule_name[len(SYNC_RULE_PREFIX) :], definition)
+        elif kind == "profile" and is_active:
+            config.profiles.append(definition)
+        if is_active and any(key in definition for key in ROUTING_KEYS):
+            config.routes.append(definition)
+    config.notification_channels = notification_channels(channels)
+    config.routing = RoutingTable(config.routes)
+    return config
+
+
+def get_tenant_config(db: Session, tenant_id) -> TenantConfig:
+    key = str(tenant_id)
+    max_age = get_settings().tenant_config_max_age_seconds
+    version = current_version(tenant_id)
+    with _snapshots_lock:
+        config = _snapshots.get(key)
+    if config is not None and time.monotonic() - config.loaded_at < max_age:
+        if version is None or version == config.version:
+            return config
+    config = load_tenant_config(db, tenant_id, version if version is not None else 0)
+    with _snapshots_lock:
+        _snapshots[key] = config
+    return config
@@ -0,0 +1,120 @@
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Extração direta de XML fiscal (NF-e, NFS-e ABRASF e NFS-e padrão nacional) para o
+# INVOICE_SCHEMA, sem LLM. Leitura em streaming (iterparse): os elementos são descartados
+# conforme processados e a leitura para ao fechar o primeiro documento fiscal.
+
+# Elementos que delimitam um documento fiscal; o atributo Id carrega a chave de acesso.
+DOCUMENT_ROOTS = {"infNFe", "InfNfse", "infNFSe"}
+
+# (campo, sufixo do caminho em nomes locais). Vale a primeira ocorrência de cada campo.
+FIELD_PATHS = (
+    ("document_number", ("ide", "nNF")),
+    ("document_number", ("infNFSe", "nNFSe")),
+    ("document_number", ("InfNfse", "Numero")),
+    ("issue_date", ("ide", "dhEmi")),
+    ("issue_date", ("ide", "dEmi")),
+    ("issue_date", ("InfNfse", "DataEmissao")),
+    ("issue_date", ("infDPS", "dhEmi")),
+    ("issue_date", ("infNFSe", "dhProc")),
+    ("cnpj", ("emit", "CNPJ")),
+    ("cnpj", ("IdentificacaoPrestador", "Cnpj")),
+    ("cnpj", ("IdentificacaoPrestador", "CpfCnpj", "Cnpj")),
+    ("cnpj", ("Prestador", "CpfCnpj", "Cnpj")),
+    ("taker_cnpj", ("dest", "CNPJ")),
+    ("taker_cnpj", ("toma", "CNPJ")),
+    ("taker_cnpj", ("IdentificacaoTomador", "Cnpj")),
+    ("taker_cnpj", ("IdentificacaoTomador", "CpfCnpj", "Cnpj")),
+    ("access_key_nfse", ("infProt", "chNFe")),
+    ("total_amount", ("ICMSTot", "vNF")),
+    ("total_amount", ("ValoresNfse", "ValorLiquidoNfse")),
+    ("total_amount", ("Valores", "ValorLiquidoNfse")),
+    ("total_amount", ("infNFSe", "valores", "vLiq")),
+    ("services_amount", ("ISSQNtot", "vServ")),
+    ("services_amount", ("Valores", "ValorServicos")),
+    ("services_amount", ("vServPrest", "vServ")),
+    ("iss_amount", ("ISSQNtot", "vISS")),
+    ("iss_amount", ("Valores", "ValorIss")),
+    ("iss_amount", ("ValoresNfse", "ValorIss")),
+    ("iss_amount", ("infNFSe", "valores", "vISSQN")),
+)
+AMOUNT_FIELDS = {"total_amount", "services_amount", "iss_amount"}
+
+_PATHS_BY_LEAF: dict[str, list[tuple[str, tuple[str, ...]]]] = {}
+for _field, _path in FIELD_PATHS:
+    _PATHS_BY_LEAF.setdefault(_path[-1], []).append((_field, _path))
+
+_DATE = re.compile(r"^(\d{4}-\d{2}-\d{2})")
+_NON_DIGIT = re.compile(r"\D")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _value(field: str, raw: str):
+    text = raw.strip()
+    if not text:
+        return None
+    if field in AMOUNT_FIELDS:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    if field == "issue_date":
+        match = _DATE.match(text)
+        return match.group(1) if match else None
+    if field in {"cnpj", "taker_cnpj", "access_key_nfse"}:
+        return _NON_DIGIT.sub("", text) or None
+    return text
+
+
+def is_fiscal_xml(filename: str | None, mime_type: str | None) -> bool:
+    return Path(filename or "").suffix.lower() == ".xml" or "xml" in (mime_type or "").lower()
+
+
+def extract_fiscal_xml(source) -> dict | None:
+    # `source` é um caminho ou arquivo binário. Retorna None se não for um XML fiscal reconhecido.
+    if isinstance(source, (str, Path)):
+        try:
+            with open(source, "rb") as handle:
+                return extract_fiscal_xml(handle)
+        except OSError:
+            return None
+
+    output: dict = {}
+    stack: list[str] = []
+    found_root = False
+    try:
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            name = _local(elem.tag)
+            if event == "start":
+                stack.append(name)
+                if name in DOCUMENT_ROOTS and not found_root:
+                    found_root = True
+                    key = _NON_DIGIT.sub("", elem.get("Id") or "")
+                    # NF-e: "NFe" + 44 dígitos; NFS-e nacional: "NFS" + 50. No ABRASF o Id é livre.
+                    if 44 <= len(key) <= 60:
+                        output["access_key_nfse"] = key
+                continue
+
+            for field, path in _PATHS_BY_LEAF.get(name, ()):
+                if field in output or tuple(stack[-len(path):]) != path:
+                    continue
+                value = _value(field, elem.text or "")
+                if value is not None:
+                    output[field] = value
+            stack.pop()
+            elem.clear()
+            if name in DOCUMENT_ROOTS and found_root and name not in stack:
+                break
+    except ET.ParseError:
+        return None
+
+    if not found_root:
+        return None
+    if "total_amount" not in output and "services_amount" in output:
+        output["total_amount"] = output["services_amount"]
+    return output
@@ -0,0 +1,294 @@
+import re
+from functools import cached_property
+from typing import Any, Callable
+
+# Extrator local (sem LLM). Cada doc_type declara os campos que sabe extrair; os padrões são
+# compilados uma única vez e buscas repetidas do mesmo padrão no mesmo texto são memoizadas.
+
+_IS = re.IGNORECASE | re.DOTALL
+_I = re.IGNORECASE
+
+_SPACES = re.compile(r"[ \t]+")
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGIT = re.compile(r"\D")
+
+NFSE_NUMBER = re.compile(r"n[úu]mero\s+da\s+nfs-?e[^\d]{0,120}(\d{1,12})", _IS)
+DOCUMENT_NUMBER = re.compile(r"(?:nota\s*fiscal|n[úu]mero|numero|doc(?:umento)?)[^\d]{0,80}(\d{3,})", _I)
+# Prioriza CNPJ formatado (com /), evitando capturar a chave de acesso.
+CNPJ_PATTERNS = (
+    re.compile(r"(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})"),
+    re.compile(r"(\d{2}\d{3}\d{3}/\d{4}-\d{2})"),
+    re.compile(r"(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})"),
+)
+CNPJ_LOOSE = CNPJ_PATTERNS[-1]
+TAKER_SECTION = re.compile(r"tomador\s+do\s+servi[cç]o(.{0,900})", _IS)
+ACCESS_KEY_LABELED = re.compile(r"chave\s+de\s+acesso\s+da\s+nfs-?e[^\d]{0,120}(\d{44,60})", _IS)
+ACCESS_KEY = re.compile(r"\b(\d{44,60})\b")
+SERVICES_AMOUNT = re.compile(r"valor\s+dos\s+servi[cç]os[^\d]{0,40}(R?\$?\s*[\d\.\,]+)", _IS)
+TOTAL_AMOUNT_PATTERNS = (
+    re.compile(r"valor\s+total\s+da\s+nfs-?e[^\d]{0,40}(R?\$?\s*[\d\.\,]+)", _IS),
+    re.compile(r"valor\s+l[íi]quido[^\d]{0,40}(R?\$?\s*[\d\.\,]+)", _IS),
+    SERVICES_AMOUNT,
+    re.compile(r"(?:total|valor)[^\d]{0,30}(R?\$?\s*[\d\.\,]+)", _IS),
+)
+ISS_AMOUNT = re.compile(r"(?:valor\s+do\s+iss|\biss\b(?:\s+retido)?)[^\d]{0,40}(R?\$?\s*[\d\.\,]+)", _IS)
+ISSUE_DATE_LABELED = re.compile(r"data\s+e\s+hora\s+da\s+emiss[aã]o[^\d]{0,30}(\d{2}/\d{2}/\d{4})", _I)
+DATE = re.compile(r"(\d{2}/\d{2}/\d{4})")
+
+TRAINEE_NAME = re.compile(r"certificamos\s+que\s+([A-ZÀ-Ú\s]+?)\s+participou", _IS)
+TRAINEE_NAME_FILENAME = re.compile(
+    r"(?:cert(?:ificado)?[-_\s]*nr-?10)[\s\-_:]+([A-ZÀ-Ú\s]+?)[\s\-_:]+\d{3}\.?\d{3}\.?\d{3}-?\d{2}", _I
+)
+CPF = re.compile(r"\b(\d{3}\.?\d{3}\.?\d{3}-?\d{2})\b")
+CPF_LIKE = re.compile(r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}")
+CERTIFICATE_COURSE = re.compile(r"participou\s+do\s+treinamento\s+(.+?)\s+em\s+conformidade", _IS)
+NR10 = re.compile(r"\bnr-?10\b", _I)
+WORKLOAD_HOURS = re.compile(r"carga\s+hor[áa]ria\s+de\s+(\d+)\s+horas", _I)
+# Empresa: linha textual imediatamente antes do CNPJ empresarial.
+COMPANY_BEFORE_CNPJ = re.compile(r"\n([A-Z0-9À-Ú][A-Z0-9À-Ú\s\.-]{5,})\n\s*\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}", _I)
+
+PRESENTATION_COURSE_PATTERNS = (
+    re.compile(r"produto:\s*treinamento\s*([^\n\r]+)", _I),
+    re.compile(r"treinament[oa]\s*(nr-?\d+(?:\s*/\s*sep)?[^\n\r]*)", _I),
+)
+INDUSTRIAL = re.compile(r"\bind[úu]str", _I)
+NORM_REFERENCES = tuple(
+    (norm, re.compile(re.escape(norm), _I)) for norm in ["NR-10", "NR-10 SEP", "NR-12", "NBR-5410", "NBR 14039"]
+)
+TARGET_AUDIENCE = re.compile(r"foco\s+em\s+(.+?)(?:\n|$)", _I)
+
+MARKDOWN_TITLE = re.compile(r"^\s*#\s+(.+)$", re.MULTILINE)
+MARKDOWN_TOPIC = re.compile(r"^\s*##\s+(.+)$", re.MULTILINE)
+ENGLISH_WORDS = re.compile(r"\b(the|and|with|this|that)\b")
+PORTUGUESE_WORDS = re.compile(r"\b(que|com|para|treinamento|documento)\b")
+
+
+def parse_brl_amount(raw: str) -> float | None:
+    if raw is None:
+        return None
+    value = raw.strip()
+    value = value.replace("R$", "").replace(" ", "")
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class LocalDocument:
+    def __init__(self, text: str, extractors: dict[str, Callable[["LocalDocument"], Any]]):
+        self.text = text
+        self.extractors = extractors
+        self._searches: dict = {}
+        self._fields: dict = {}
+
+    @cached_property
+    def text_norm(self) -> str:
+        return _SPACES.sub(" ", self.text)
+
+    @cached_property
+    def text_lower(self) -> str:
+        return self.text.lower()
+
+    def search(self, pattern: re.Pattern, normalized: bool = False):
+        key = (pattern, normalized)
+        if key not in self._searches:
+            self._searches[key] = pattern.search(self.text_norm if normalized else self.text)
+        return self._searches[key]
+
+    def first(self, patterns, normalized: bool = False):
+        for pattern in patterns:
+            match = self.search(pattern, normalized)
+            if match:
+                return match
+        return None
+
+    def field(self, name: str):
+        if name not in self._fields:
+            extractor = self.extractors.get(name)
+            self._fields[name] = extractor(self) if extractor else None
+        return self._fields[name]
+
+
+def _collapse(value: str) -> str:
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def _amount(match) -> float | None:
+    return parse_brl_amount(match.group(1)) if match else None
+
+
+def _document_number(doc: LocalDocument):
+    match = doc.search(NFSE_NUMBER, normalized=True) or doc.search(DOCUMENT_NUMBER)
+    return match.group(1) if match else None
+
+
+def _cnpj(doc: LocalDocument):
+    match = doc.first(CNPJ_PATTERNS)
+    return _NON_DIGIT.sub("", match.group(1)) if match else None
+
+
+def _taker_cnpj(doc: LocalDocument):
+    # CNPJ do tomador (quando presente na seção TOMADOR DO SERVIÇO).
+    section = doc.search(TAKER_SECTION, normalized=True)
+    match = CNPJ_LOOSE.search(section.group(1)) if section else None
+    return _NON_DIGIT.sub("", match.group(1)) if match else None
+
+
+def _access_key_nfse(doc: LocalDocument):
+    # Chave de acesso NFS-e (normalmente 44 dígitos).
+    match = doc.search(ACCESS_KEY_LABELED, normalized=True) or doc.search(ACCESS_KEY, normalized=True)
+    return match.group(1) if match else None
+
+
+def _total_amount(doc: LocalDocument):
+    return _amount(doc.first(TOTAL_AMOUNT_PATTERNS, normalized=True))
+
+
+def _services_amount(doc: LocalDocument):
+    return _amount(doc.search(SERVICES_AMOUNT, normalized=True))
+
+
+def _iss_amount(doc: LocalDocument):
+    return _amount(doc.search(ISS_AMOUNT, normalized=True))
+
+
+def _issue_date(doc: LocalDocument):
+    match = doc.search(ISSUE_DATE_LABELED, normalized=True) or doc.search(DATE)
+    if not match:
+        return None
+    d, m, y = match.group(1).split("/")
+    return f"{y}-{m}-{d}"
+
+
+def _trainee_name(doc: LocalDocument):
+    # Nome do participante entre "Certificamos que" e "participou"; senão, o nome no arquivo.
+    match = doc.search(TRAINEE_NAME)
+    if match:
+        return _collapse(match.group(1))
+    match = doc.search(TRAINEE_NAME_FILENAME)
+    return _collapse(match.group(1)).upper() if match else None
+
+
+def _trainee_cpf(doc: LocalDocument):
+    match = doc.search(CPF)
+    return _NON_DIGIT.sub("", match.group(1)) if match else None
+
+
+def _certificate_course(doc: LocalDocument):
+    match = doc.search(CERTIFICATE_COURSE)
+    if match:
+        return _collapse(match.group(1))
+    return "NR-10 - Básico" if doc.search(NR10) else None
+
+
+def _workload_hours(doc: LocalDocument):
+    match = doc.search(WORKLOAD_HOURS, normalized=True)
+    return float(match.group(1)) if match else None
+
+
+def _company_name(doc: LocalDocument):
+    match = doc.search(COMPANY_BEFORE_CNPJ)
+    if not match:
+        return None
+    value = _collapse(match.group(1))
+    return None if CPF_LIKE.search(value) else value
+
+
+def _presentation_course(doc: LocalDocument):
+    match = doc.first(PRESENTATION_COURSE_PATTERNS)
+    if match:
+        return _collapse(match.group(1))
+    return "NR-10 - Aplicada à Indústria" if doc.search(NR10) else None
+
+
+def _focus_area(doc: LocalDocument):
+    return "industrial" if doc.search(INDUSTRIAL) else None
+
+
+def _norm_references(doc: LocalDocument):
+    return [norm for norm, pattern in NORM_REFERENCES if doc.search(pattern)] or None
+
+
+def _target_audience(doc: LocalDocument):
+    match = doc.search(TARGET_AUDIENCE)
+    return _collapse(match.group(1)) if match else None
+
+
+def _title(doc: LocalDocument):
+    match = doc.search(MARKDOWN_TITLE)
+    return match.group(1).strip() if match else None
+
+
+def _main_topic(doc: LocalDocument):
+    match = doc.search(MARKDOWN_TOPIC)
+    return match.group(1).strip() if match else doc.field("title")
+
+
+def _summary(doc: LocalDocument):
+    lines = [ln.strip() for ln in doc.text.splitlines() if ln.strip() and not ln.strip().startswith("#")]
+    return " ".join(lines[:3])[:500] if lines else None
+
+
+def _language(doc: LocalDocument):
+    if ENGLISH_WORDS.search(doc.text_lower):
+        return "en"
+    if PORTUGUESE_WORDS.search(doc.text_lower):
+        return "pt-BR"
+    return None
+
+
+INVOICE_EXTRACTORS = {
+    "document_number": _document_number,
+    "cnpj": _cnpj,
+    "taker_cnpj": _taker_cnpj,
+    "access_key_nfse": _access_key_nfse,
+    "total_amount": _total_amount,
+    "services_amount": _services_amount,
+    "iss_amount": _iss_amount,
+    "issue_date": _issue_date,
+}
+
+EXTRACTORS_BY_DOC_TYPE = {
+    "training_certificate": {
+        "issue_date": _issue_date,
+        "trainee_name": _trainee_name,
+        "trainee_cpf": _trainee_cpf,
+        "course_name": _certificate_course,
+        "workload_hours": _workload_hours,
+        "company_name": _company_name,
+    },
+    "training_presentation": {
+        "issue_date": _issue_date,
+        "course_name": _presentation_course,
+        "focus_area": _focus_area,
+        "norm_references": _norm_references,
+        "target_audience": _target_audience,
+    },
+    "generic_document": {
+        "issue_date": _issue_date,
+        "title": _title,
+        "main_topic": _main_topic,
+        "summary": _summary,
+        "language": _language,
+    },
+}
+
+
+def extractors_for(doc_type: str | None) -> dict[str, Callable[[LocalDocument], Any]]:
+    return EXTRACTORS_BY_DOC_TYPE.get("generic_document" if doc_type is None else doc_type, INVOICE_EXTRACTORS)
+
+
+def local_extract(content: str, doc_type: str | None = None, fields=None) -> dict:
+    # `fields` restringe a avaliação às propriedades do schema alvo.
+    extractors = extractors_for(doc_type)
+    doc = LocalDocument(content or "", extractors)
+    output: dict = {}
+    for name in extractors:
+        if fields is not None and name not in fields:
+            continue
+        value = doc.field(name)
+        if value is not None:
+            output[name] = value
+    return output
@@ -0,0 +1,106 @@
+import json
+import time
+import uuid
+
+from redis import Redis
+
+from backend.app.core.redis import get_redis
+
+PROCESSING_TENANTS_KEY = "llm:classify:processing_tenants"
+
+# Retira até N itens da fila e registra o lote em processamento na mesma operação: se o worker
+# morrer depois de drenar, o lote continua no hash e a varredura o devolve à fila.
+_DRAIN_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('LTRIM', KEYS[1], #items, -1)
+redis.call('HSET', KEYS[2], ARGV[2], cjson.encode({claimed_at = tonumber(ARGV[3]), items = items}))
+redis.call('SADD', KEYS[3], ARGV[4])
+return items
+"""
+
+_REQUEUE_SCRIPT = """
+local requeued = 0
+local batches = redis.call('HGETALL', KEYS[2])
+for i = 1, #batches, 2 do
+    local batch = cjson.decode(batches[i + 1])
+    if batch.claimed_at <= tonumber(ARGV[1]) then
+        for j = #batch.items, 1, -1 do
+            redis.call('LPUSH', KEYS[1], batch.items[j])
+        end
+        redis.call('HDEL', KEYS[2], batches[i])
+        requeued = requeued + #batch.items
+    end
+end
+if redis.call('HLEN', KEYS[2]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[2])
+end
+return requeued
+"""
+
+
+class ClassificationBatcher:
+    # Fila por tenant no Redis: documentos aguardando classificação via LLM são agrupados numa
+    # janela curta (ou até N itens) e classificados numa única requisição.
+    def __init__(self, client: Redis | None = None):
+        self.client = client or get_redis()
+
+    def _queue_key(self, tenant_id) -> str:
+        return f"llm:classify:pending:{tenant_id}"
+
+    def _flush_key(self, tenant_id) -> str:
+        return f"llm:classify:flush:{tenant_id}"
+
+    def submit(self, tenant_id, item: dict) -> int:
+        return int(self.client.rpush(self._queue_key(tenant_id), json.dumps(item)))
+
+    def claim_flush(self, tenant_id, window_seconds: int) -> bool:
+        # Só o primeiro documento da janela agenda o flush.
+        return bool(self.client.set(self._flush_key(tenant_id), "1", nx=True, ex=max(1, window_seconds) * 4))
+
+    def release_flush(self, tenant_id) -> None:
+        self.client.delete(self._flush_key(tenant_id))
+
+    def _processing_key(self, tenant_id) -> str:
+        return f"llm:classify:processing:{tenant_id}"
+
+    def drain(self, tenant_id, limit: int) -> tuple[str, list[dict]]:
+        # Devolve o id do lote para ack(); o lote só sai do hash de processamento depois do ack.
+        batch_id = uuid.uuid4().hex
+        raw = self.client.eval(
+            _DRAIN_SCRIPT,
+            3,
+            self._queue_key(tenant_id),
+            self._processing_key(tenant_id),
+            PROCESSING_TENANTS_KEY,
+            limit,
+            batch_id,
+            time.time(),
+            str(tenant_id),
+        )
+        return batch_id, [json.loads(item) for item in raw or []]
+
+    def ack(self, tenant_id, batch_id: str) -> None:
+        self.client.hdel(self._processing_key(tenant_id), batch_id)
+
+    def processing_tenants(self) -> list[str]:
+        return [item.decode() if isinstance(item, bytes) else item for item in self.client.smembers(PROCESSING_TENANTS_KEY)]
+
+    def requeue_stale(self, tenant_id, timeout_seconds: int) -> int:
+        # Lotes drenados há mais de timeout_seconds sem ack voltam para o início da fila.
+        return int(
+            self.client.eval(
+                _REQUEUE_SCRIPT,
+                3,
+                self._queue_key(tenant_id),
+                self._processing_key(tenant_id),
+                PROCESSING_TENANTS_KEY,
+                time.time() - timeout_seconds,
+                str(tenant_id),
+            )
+        )
+
+    def pending(self, tenant_id) -> int:
+        return int(self.client.llen(self._queue_key(tenant_id)))
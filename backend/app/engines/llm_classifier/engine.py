@@ -1,15 +1,77 @@
-from backend.app.adapters.llm.openai_provider import OpenAIProvider
-from backend.app.engines.llm_classifier.prompts import build_classification_prompt
+from backend.app.adapters.llm.cached_provider import build_llm_provider
+from backend.app.engines.llm_classifier.prompts import (
+    BATCH_MAX_BODY_CHARS,
+    PROMPT_VERSION,
+    build_batch_classification_prompt,
+    build_classification_prompt,
+)
 from backend.app.engines.llm_classifier.schemas import CLASSIFICATION_REQUIRED_KEYS
 
 
 class LLMClassifierEngine:
     def __init__(self):
-        self.provider = OpenAIProvider()
+        self.provider = build_llm_provider()
+
+    def cached(self, subject: str, sender: str, body: str) -> dict | None:
+        prompt = build_classification_prompt(subject, sender, body)
+        payload = self.provider.lookup("classify", prompt, PROMPT_VERSION)
+        if payload is None or CLASSIFICATION_REQUIRED_KEYS - set(payload.keys()):
+            return None
+        return payload
 
     def classify(self, subject: str, sender: str, body: str) -> dict:
-        payload = self.provider.classify(build_classification_prompt(subject, sender, body))
+        return self.classify_counted(subject, sender, body)[0]
+
+    def classify_counted(self, subject: str, sender: str, body: str) -> tuple[dict, int]:
+        # Retorna o resultado e quantas chamadas ao LLM foram feitas (0 num acerto de cache).
+        prompt = build_classification_prompt(subject, sender, body)
+        payload, hit = self.provider.classify_cached(prompt, PROMPT_VERSION)
         missing = CLASSIFICATION_REQUIRED_KEYS - set(payload.keys())
         if missing:
+            self.provider.evict("classify", prompt, PROMPT_VERSION)
             raise ValueError(f"missing keys: {missing}")
-        return payload
+        return payload, 0 if hit else 1
+
+    def classify_many(self, items: list[dict]) -> tuple[list[dict | None], int]:
+        # Uma única requisição para vários documentos; itens ausentes ou inválidos na resposta
+        # são reclassificados individualmente. Retorna os resultados na ordem de entrada (None
+        # para itens cuja classificação individual falhou) e o número de chamadas ao LLM
+        # efetivamente feitas (acertos de cache não contam).
+        results: dict[str, dict | None] = {}
+        misses = []
+        for item in items:
+            cached = self.cached(item.get("subject", ""), item.get("sender", ""), item.get("body", ""))
+            if cached is not None:
+                results[str(item["id"])] = cached
+            else:
+                misses.append(item)
+
+        calls = 0
+        # Sem cliente configurado o fallback por palavras-chave só funciona documento a documento.
+        if len(misses) > 1 and self.provider.client is not None:
+            calls = 1
+            try:
+                payload = self.provider.classify(build_batch_classification_prompt(misses), cache=False)
+                for entry in payload.get("results") or []:
+                    if isinstance(entry, dict) and not CLASSIFICATION_REQUIRED_KEYS - set(entry.keys()):
+                        results[str(entry.get("id"))] = {key: entry[key] for key in CLASSIFICATION_REQUIRED_KEYS}
+            except Exception:
+                pass
+
+        for item in misses:
+            subject, sender, body = item.get("subject", ""), item.get("sender", ""), item.get("body", "")
+            key = str(item["id"])
+            if key in results:
+                # A resposta do lote viu o corpo cortado: grava sob a chave do prompt com esse mesmo
+                # corpo, para não servir como resposta ao documento completo quando houve corte.
+                prompt = build_classification_prompt(subject, sender, body[:BATCH_MAX_BODY_CHARS])
+                self.provider.store("classify", prompt, results[key], PROMPT_VERSION)
+                continue
+            try:
+                results[key], item_calls = self.classify_counted(subject, sender, body)
+                calls += item_calls
+            except Exception:
+                results[key] = None
+                if self.provider.client is not None:
+                    calls += 1
+        return [results[str(item["id"])] for item in items], calls
@@ -1,3 +1,9 @@
+# Incrementar quando o texto dos prompts mudar: invalida o cache de respostas do LLM.
+PROMPT_VERSION = "1"
+
+# Limite do corpo de cada documento no prompt em lote (o prompt individual não corta o corpo).
+BATCH_MAX_BODY_CHARS = 6000
+
 
 def build_classification_prompt(subject: str, sender: str, body: str) -> str:
     return (
@@ -5,3 +11,16 @@ def build_classification_prompt(subject: str, sender: str, body: str) -> str:
         "category, department, confidence, priority, reason. "
         f"Assunto: {subject}\nRemetente: {sender}\nConteudo: {body}"
     )
+
+
+def build_batch_classification_prompt(items: list[dict], max_body_chars: int = BATCH_MAX_BODY_CHARS) -> str:
+    blocks = [
+        f"### Documento {item['id']}\nAssunto: {item.get('subject', '')}\nRemetente: {item.get('sender', '')}\n"
+        f"Conteudo: {(item.get('body') or '')[:max_body_chars]}"
+        for item in items
+    ]
+    return (
+        "Classifique cada documento abaixo de forma independente e retorne JSON estrito no formato "
+        '{"results": [{"id": "<id do documento>", "category": ..., "department": ..., "confidence": ..., '
+        '"priority": ..., "reason": ...}]}, com exatamente um item por documento.\n\n' + "\n\n".join(blocks)
+    )
@@ -1,78 +1,294 @@
+import fcntl
+import re
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
 from shutil import which
+from typing import Callable
 
+from backend.app.core.config import get_settings
 
 TEXT_SUFFIXES = {".txt", ".csv", ".json", ".xml", ".md", ".log"}
 IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
 
+# Incrementar ao mudar a lógica de extração para invalidar o cache de texto.
+EXTRACTOR_VERSION = "3"
+
+
+@dataclass
+class TextExtraction:
+    text: str
+    pages_total: int | None = None
+    pages_covered: int | None = None
+    truncated: bool = False
+
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_SLOT_DIR = Path(tempfile.gettempdir()) / "epe-extract-slots"
+
+
+def _extraction_pool() -> ThreadPoolExecutor:
+    # O trabalho pesado roda em subprocessos (pdftotext/pdftoppm/tesseract); threads bastam para
+    # ocupar todos os núcleos e funcionam dentro de workers Celery prefork (processos daemon).
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=get_settings().extraction_pool_workers,
+                thread_name_prefix="epe-extract",
+            )
+        return _pool
+
+
+def _acquire_host_slot(deadline: float):
+    # Semáforo por host (flock em arquivos de slot) compartilhado pelos filhos prefork do Celery:
+    # no máximo extraction_host_concurrency subprocessos pesados ao mesmo tempo, qualquer que seja
+    # o número de workers. Devolve None se o prazo do documento vencer antes de obter um slot.
+    slots = max(1, get_settings().extraction_host_concurrency)
+    _SLOT_DIR.mkdir(parents=True, exist_ok=True)
+    while True:
+        for index in range(slots):
+            handle = open(_SLOT_DIR / f"{index}.lock", "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        if _remaining(deadline) <= 0:
+            return None
+        time.sleep(0.05)
+
+
+def _release_host_slot(handle) -> None:
+    try:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    finally:
+        handle.close()
+
+
+def _with_host_slot(fn: Callable[[int, float], str]) -> Callable[[int, float], str]:
+    def run(page: int, deadline: float) -> str:
+        handle = _acquire_host_slot(deadline)
+        if handle is None:
+            return ""
+        try:
+            return fn(page, deadline)
+        finally:
+            _release_host_slot(handle)
+
+    return run
+
 
 def _safe_trim(text: str, max_chars: int) -> str:
     return text[:max_chars].strip() if text else ""
 
 
-def _extract_pdf_text(path: Path) -> str:
-    if which("pdftotext"):
-        try:
-            result = subprocess.run(
-                ["pdftotext", str(path), "-"],
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=20,
-            )
-            if result.returncode == 0 and result.stdout:
-                return result.stdout
-        except Exception:
-            pass
+def _run(cmd: list[str], timeout: float) -> str:
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False, timeout=max(1.0, timeout))
+        if result.returncode == 0:
+            return result.stdout or ""
+    except Exception:
+        pass
+    return ""
+
 
+def _remaining(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+
+def _map_pages(fn: Callable[[int, float], str], pages: list[int], deadline: float) -> dict[int, str]:
+    pool = _extraction_pool()
+    fn = _with_host_slot(fn)
+    pending: dict[Future, int] = {pool.submit(fn, page, deadline): page for page in pages}
+    results: dict[int, str] = {}
+    while pending and _remaining(deadline) > 0:
+        done, _ = wait(pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        for future in done:
+            page = pending.pop(future)
+            try:
+                results[page] = future.result() or ""
+            except Exception:
+                results[page] = ""
+    for future in pending:
+        future.cancel()
+    return results
+
+
+def _pdf_page_count(path: Path) -> int:
+    if which("pdfinfo"):
+        match = re.search(r"^Pages:\s+(\d+)", _run(["pdfinfo", str(path)], 20), re.MULTILINE)
+        if match:
+            return int(match.group(1))
     try:
         from pypdf import PdfReader  # type: ignore
 
-        reader = PdfReader(str(path))
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
+        return len(PdfReader(str(path)).pages)
     except Exception:
-        return ""
+        return 0
 
 
-def _extract_image_text(path: Path) -> str:
-    if not which("tesseract"):
-        return ""
+def _pypdf_reader(path: Path):
     try:
-        result = subprocess.run(
-            ["tesseract", str(path), "stdout"],
-            capture_output=True,
-            text=True,
-            check=False,
-            timeout=20,
-        )
-        if result.returncode == 0:
-            return result.stdout or ""
+        from pypdf import PdfReader  # type: ignore
+
+        return PdfReader(str(path))
     except Exception:
+        return None
+
+
+def _pdf_text_layer_pages(path: Path, pages: list[int], deadline: float, reader=None) -> dict[int, str]:
+    if reader is None:
+        def page_text(page: int, page_deadline: float) -> str:
+            return _run(["pdftotext", "-f", str(page), "-l", str(page), str(path), "-"], _remaining(page_deadline))
+
+        return _map_pages(page_text, pages, deadline)
+
+    results: dict[int, str] = {}
+    for page in pages:
+        try:
+            results[page] = reader.pages[page - 1].extract_text() or ""
+        except Exception:
+            results[page] = ""
+    return results
+
+
+def _ocr_pdf_page(path: Path, page: int, deadline: float) -> str:
+    with tempfile.TemporaryDirectory(prefix="epe-ocr-") as tmp:
+        prefix = Path(tmp) / "page"
+        _run(
+            ["pdftoppm", "-f", str(page), "-l", str(page), "-r", "300", "-png", "-singlefile", str(path), str(prefix)],
+            _remaining(deadline),
+        )
+        image = prefix.with_suffix(".png")
+        if not image.exists():
+            return ""
+        return _run(["tesseract", str(image), "stdout"], _remaining(deadline))
+
+
+def _extract_pdf_text(path: Path, max_chars: int) -> TextExtraction:
+    settings = get_settings()
+    deadline = time.monotonic() + settings.extraction_deadline_seconds
+    reader = None
+    if not which("pdftotext"):
+        reader = _pypdf_reader(path)
+        if reader is None:
+            return TextExtraction("")
+    # pypdf de reserva para páginas em que o pdftotext falha; aberto só quando preciso.
+    fallback_reader = None
+    fallback_tried = reader is not None
+    total_pages = len(reader.pages) if reader is not None else _pdf_page_count(path)
+    if total_pages <= 0:
+        text = _run(["pdftotext", str(path), "-"], 20)
+        return TextExtraction(_safe_trim(text, max_chars), truncated=len(text) > max_chars)
+
+    ocr_enabled = bool(which("pdftoppm") and which("tesseract"))
+    ocr_budget = settings.extraction_max_ocr_pages
+    last_page = min(total_pages, settings.extraction_max_pages)
+    window = max(1, settings.extraction_pool_workers)
+    chunks: list[str] = []
+    size = 0
+    covered = 0
+
+    # Processa janelas de páginas e para assim que o orçamento de caracteres é atingido.
+    for first in range(1, last_page + 1, window):
+        if _remaining(deadline) <= 0:
+            break
+        pages = list(range(first, min(first + window, last_page + 1)))
+        texts = _pdf_text_layer_pages(path, pages, deadline, reader)
+        missing = [page for page in pages if not texts.get(page, "").strip()]
+        if missing and not fallback_tried:
+            fallback_tried = True
+            fallback_reader = _pypdf_reader(path)
+        if missing and fallback_reader is not None:
+            for page, text in _pdf_text_layer_pages(path, missing, deadline, fallback_reader).items():
+                if text.strip():
+                    texts[page] = text
+
+        # Páginas sem camada de texto (digitalizadas) são rasterizadas e passam por OCR em paralelo.
+        if ocr_enabled and ocr_budget > 0:
+            scanned = [page for page in pages if not texts.get(page, "").strip()][:ocr_budget]
+            if scanned:
+                ocr_budget -= len(scanned)
+                texts.update(
+                    _map_pages(lambda page, page_deadline: _ocr_pdf_page(path, page, page_deadline), scanned, deadline)
+                )
+
+        for page in pages:
+            text = texts.get(page, "")
+            chunks.append(text)
+            size += len(text) + 1
+            covered = page
+            if size >= max_chars:
+                break
+        if size >= max_chars:
+            break
+
+    text = "\n".join(chunks)
+    return TextExtraction(
+        _safe_trim(text, max_chars),
+        pages_total=total_pages,
+        pages_covered=covered,
+        truncated=covered < total_pages or len(text) > max_chars,
+    )
+
+
+def _extract_image_text(path: Path) -> str:
+    if not which("tesseract"):
         return ""
-    return ""
+    deadline = time.monotonic() + get_settings().extraction_deadline_seconds
+    return _with_host_slot(
+        lambda _, page_deadline: _run(["tesseract", str(path), "stdout"], _remaining(page_deadline))
+    )(1, deadline)
+
+
+def extractor_for(file_path: str, mime_type: str | None = None, filename: str | None = None) -> str:
+    # Blobs endereçados por conteúdo não têm extensão; o sufixo vem do nome original quando houver.
+    suffix = Path(filename or file_path).suffix.lower()
+    mime = (mime_type or "").lower()
+    if suffix in TEXT_SUFFIXES:
+        return "text"
+    if suffix == ".pdf" or "pdf" in mime:
+        return "pdf"
+    if suffix in IMAGE_SUFFIXES or mime.startswith("image/"):
+        return "ocr"
+    return "raw"
 
 
-def extract_text_from_file(file_path: str, mime_type: str | None = None, max_chars: int = 20000) -> str:
+def extract_document_text(
+    file_path: str,
+    mime_type: str | None = None,
+    max_chars: int = 20000,
+    filename: str | None = None,
+) -> TextExtraction:
     path = Path(file_path)
     if not path.exists() or not path.is_file():
-        return ""
+        return TextExtraction("")
 
-    suffix = path.suffix.lower()
-    if suffix in TEXT_SUFFIXES:
+    extractor = extractor_for(file_path, mime_type, filename)
+    if extractor == "text":
         try:
-            return _safe_trim(path.read_text(encoding="utf-8", errors="ignore"), max_chars)
+            with path.open(encoding="utf-8", errors="ignore") as handle:
+                text = handle.read(max_chars + 1)
+            return TextExtraction(_safe_trim(text, max_chars), truncated=len(text) > max_chars)
         except Exception:
-            return ""
+            return TextExtraction("")
 
-    if suffix == ".pdf" or (mime_type and "pdf" in mime_type.lower()):
-        return _safe_trim(_extract_pdf_text(path), max_chars)
+    if extractor == "pdf":
+        return _extract_pdf_text(path, max_chars)
 
-    if suffix in IMAGE_SUFFIXES or (mime_type and mime_type.lower().startswith("image/")):
-        return _safe_trim(_extract_image_text(path), max_chars)
+    if extractor == "ocr":
+        text = _extract_image_text(path)
+        return TextExtraction(_safe_trim(text, max_chars), 1, 1, truncated=len(text) > max_chars)
 
     try:
         raw = path.read_bytes()[:200000]
-        return _safe_trim(raw.decode("utf-8", errors="ignore"), max_chars)
+        text = raw.decode("utf-8", errors="ignore")
+        return TextExtraction(_safe_trim(text, max_chars), truncated=len(text) > max_chars)
     except Exception:
-        return ""
+        return TextExtraction("")
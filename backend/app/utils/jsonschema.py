@@ -1,9 +1,48 @@
-from jsonschema import ValidationError, validate
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from jsonschema import Draft202012Validator
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
+
+MAX_CACHED_VALIDATORS = 256
+
+_validators: "OrderedDict[str, Validator]" = OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def schema_hash(schema: dict) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def get_validator(schema: dict) -> Validator:
+    # O meta-schema é verificado uma única vez por conteúdo de schema; o validador pronto fica
+    # num LRU limitado (schemas de tenant mudam raramente).
+    key = schema_hash(schema)
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is not None:
+            _validators.move_to_end(key)
+            return validator
+    cls = validator_for(schema, default=Draft202012Validator)
+    cls.check_schema(schema)
+    validator = cls(schema)
+    with _validators_lock:
+        _validators[key] = validator
+        while len(_validators) > MAX_CACHED_VALIDATORS:
+            _validators.popitem(last=False)
+    return validator
+
+
+def schema_errors(payload: dict, schema: dict) -> list[str]:
+    errors = sorted(get_validator(schema).iter_errors(payload), key=lambda error: list(error.path))
+    return [f"{'/'.join(str(part) for part in error.path) or '$'}: {error.message}" for error in errors]
 
 
 def validate_json_schema(payload: dict, schema: dict) -> tuple[bool, str | None]:
-    try:
-        validate(instance=payload, schema=schema)
-        return True, None
-    except ValidationError as exc:
-        return False, str(exc)
+    errors = schema_errors(payload, schema)
+    if errors:
+        return False, "; ".join(errors)
+    return True, None
@@ -13,6 +13,9 @@ const endpoints = {
   review: "/api/v1/review",
 };
 
+// Listas paginadas por cursor (header X-Next-Cursor); o painel acumula as páginas carregadas.
+const pagedViews = new Set(["emails", "documents", "review"]);
+
 const versionLine = document.getElementById("versionLine");
 const buildLine = document.getElementById("buildLine");
 const loginCard = document.getElementById("loginCard");
@@ -291,6 +294,9 @@ function renderConfigs(data) {
         <div class="field"><label>Webhook WhatsApp</label><input id="notifWhatsappWebhook" type="text" placeholder="https://seu-endpoint/whatsapp" value="${data.notifications?.whatsapp_webhook_url || ""}" /></div>
         <div class="field"><label>Telegram (vírgula)</label><input id="notifTelegram" type="text" placeholder="@usuario1,@usuario2" value="${(data.notifications?.telegram_users || []).join(",")}" /></div>
         <div class="field"><label>Webhook Telegram</label><input id="notifTelegramWebhook" type="text" placeholder="https://seu-endpoint/telegram" value="${data.notifications?.telegram_webhook_url || ""}" /></div>
+        <div class="field"><label>Resumo por canal (email,whatsapp,telegram)</label><input id="notifDigestChannels" type="text" placeholder="email,whatsapp" value="${(data.notifications?.digest_channels || []).join(",")}" /></div>
+        <div class="field"><label>Janela do resumo (segundos)</label><input id="notifDigestWindow" type="number" min="1" value="${data.notifications?.digest_window_seconds ?? 60}" /></div>
+        <div class="field"><label>Máximo de documentos por resumo</label><input id="notifDigestMax" type="number" min="1" value="${data.notifications?.digest_max_documents ?? 50}" /></div>
         <button id="saveNotificationsBtn" class="primary-btn">Salvar avisos</button>
         <p id="notificationsStatus" class="status ok"></p>
       </section>
@@ -405,6 +411,18 @@ async function apiGet(path) {
   return await res.json();
 }
 
+async function apiGetPage(path, cursor) {
+  const url = cursor ? `${path}?cursor=${encodeURIComponent(cursor)}` : path;
+  const res = await fetch(url, {
+    headers: { Authorization: `Bearer ${state.token}` },
+  });
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(`HTTP ${res.status} - ${text}`);
+  }
+  return { items: await res.json(), next: res.headers.get("X-Next-Cursor") };
+}
+
 async function apiPost(path, payload) {
   const res = await fetch(path, {
     method: "POST",
@@ -453,18 +471,49 @@ async function loadView() {
       data = { rules, prompts, schemas, routes, accounts, notifications, documentProfiles };
     } else if (state.currentView === "test-ai") {
       data = {};
+    } else if (pagedViews.has(state.currentView)) {
+      const page = await apiGetPage(endpoints[state.currentView]);
+      state.pageItems = page.items;
+      state.nextCursor = page.next;
+      data = state.pageItems;
     } else {
       data = await apiGet(endpoints[state.currentView]);
     }
-    panelBody.innerHTML = renderView(state.currentView, data);
-    if (state.currentView === "configs") bindConfigActions();
-    if (state.currentView === "test-ai") bindTestAiActions();
-    if (state.currentView === "review") bindReviewActions();
+    paintView(state.currentView, data);
   } catch (err) {
     panelBody.innerHTML = `<div class="empty">Erro: ${err.message}</div>`;
   }
 }
 
+function paintView(view, data) {
+  panelBody.innerHTML = renderView(view, data);
+  if (view === "configs") bindConfigActions();
+  if (view === "test-ai") bindTestAiActions();
+  if (view === "review") bindReviewActions();
+  if (pagedViews.has(view) && state.nextCursor) bindLoadMore(view);
+}
+
+function bindLoadMore(view) {
+  panelBody.insertAdjacentHTML(
+    "beforeend",
+    `<div class="toolbar-actions"><button id="loadMoreBtn" class="secondary-btn">Carregar mais</button></div>`,
+  );
+  const btn = document.getElementById("loadMoreBtn");
+  btn.addEventListener("click", async () => {
+    btn.disabled = true;
+    try {
+      const page = await apiGetPage(endpoints[view], state.nextCursor);
+      if (state.currentView !== view) return;
+      state.pageItems = state.pageItems.concat(page.items);
+      state.nextCursor = page.next;
+      paintView(view, state.pageItems);
+    } catch (err) {
+      btn.disabled = false;
+      btn.textContent = `Erro: ${err.message}`;
+    }
+  });
+}
+
 function bindReviewActions() {
   const approveBtn = document.getElementById("approveReviewBtn");
   const reprocessBtn = document.getElementById("reprocessReviewBtn");
@@ -847,6 +896,9 @@ function bindConfigActions() {
       email_webhook_url: document.getElementById("notifEmailWebhook").value.trim() || null,
       whatsapp_webhook_url: document.getElementById("notifWhatsappWebhook").value.trim() || null,
       telegram_webhook_url: document.getElementById("notifTelegramWebhook").value.trim() || null,
+      digest_channels: parseList(document.getElementById("notifDigestChannels").value),
+      digest_window_seconds: Number(document.getElementById("notifDigestWindow").value) || 60,
+      digest_max_documents: Number(document.getElementById("notifDigestMax").value) || 50,
     };
     try {
       await apiPost("/api/v1/configs/notifications", payload);
@@ -10,4 +10,8 @@ celery_app = Celery(
     backend=settings.redis_url,
 )
 
-celery_app.conf.task_routes = {"backend.app.workers.tasks.*": {"queue": "epe"}}
+celery_app.conf.task_routes = {
+    # Extração de texto/OCR tem fila e worker próprios para não ocupar os slots de sync e classificação.
+    "backend.app.workers.tasks.process_document": {"queue": "epe.documents"},
+    "backend.app.workers.tasks.*": {"queue": "epe"},
+}
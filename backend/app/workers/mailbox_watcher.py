@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+from sqlalchemy import update
+
+from backend.app.adapters.email.imap_client import ImapClientAdapter
+from backend.app.core.config import get_settings
+from backend.app.core.logging import setup_logging
+from backend.app.db.models import EmailAccount
+from backend.app.db.session import SessionLocal, engine
+from backend.app.workers.tasks import SYNC_FOLDER, sync_mailbox
+
+# Serviço de longa duração que mantém as sessões IMAP abertas e ingere mensagens novas em segundos:
+#   python -m backend.app.workers.mailbox_watcher --shard 0 --shards 2
+# Cada processo cuida das contas com id % shards == shard. Enquanto uma conta está sendo
+# vigiada, o lease (email_accounts.sync_lease_until) é renovado e o beat não a enfileira.
+
+logger = logging.getLogger(__name__)
+
+
+def _account_key(account) -> tuple:
+    return (account.imap_host, account.imap_port, account.imap_username, account.imap_password_enc, account.use_ssl)
+
+
+def load_shard_accounts(shard: int, shards: int, limit: int) -> dict[str, tuple]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                EmailAccount.id,
+                EmailAccount.imap_host,
+                EmailAccount.imap_port,
+                EmailAccount.imap_username,
+                EmailAccount.imap_password_enc,
+                EmailAccount.use_ssl,
+            )
+            .filter(EmailAccount.is_active == True)
+            .order_by(EmailAccount.id)
+            .all()
+        )
+    finally:
+        db.close()
+    # Contas além do limite de sessões continuam no polling do beat.
+    owned = [row for row in rows if row.id.int % shards == shard][:limit]
+    return {str(row.id): _account_key(row) for row in owned}
+
+
+def set_lease(account_id: str, seconds: int | None) -> None:
+    lease_until = datetime.utcnow() + timedelta(seconds=seconds) if seconds else None
+    db = SessionLocal()
+    try:
+        db.execute(update(EmailAccount).where(EmailAccount.id == account_id).values(sync_lease_until=lease_until))
+        db.commit()
+    finally:
+        db.close()
+
+
+def sync_once(account_id: str, client: ImapClientAdapter, imap) -> None:
+    db = SessionLocal()
+    try:
+        account = db.query(EmailAccount).filter(EmailAccount.id == account_id).first()
+        if not account:
+            return
+        while sync_mailbox(db, account, client, imap)["has_more"]:
+            pass
+    finally:
+        db.close()
+
+
+async def _run_blocking(fn, *args, on_cancel=None):
+    # Cancelar a task não para a thread; espera ela sair (interrompendo-a via on_cancel) para que
+    # logout e liberação do lease nunca corram em paralelo com uma chamada na mesma sessão IMAP.
+    future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if on_cancel is not None:
+            on_cancel()
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                continue
+        raise
+
+
+class MailboxWatcher:
+    def __init__(self, shard: int = 0, shards: int = 1):
+        self.settings = get_settings()
+        self.shard = shard
+        self.shards = shards
+        self.tasks: dict[str, tuple[tuple, asyncio.Task]] = {}
+        # Tasks canceladas que ainda estão encerrando a sessão; a conta só é vigiada de novo depois.
+        self.stopping: dict[str, asyncio.Task] = {}
+        # Cada sync_once segura uma conexão do pool do SQLAlchemy durante toda a sincronização: limita
+        # as simultâneas ao pool_size para que uma rajada de IDLE não esgote o pool (o overflow fica
+        # para set_lease e load_shard_accounts, que são rápidos).
+        self.sync_slots = asyncio.Semaphore(max(1, engine.pool.size()))
+
+    async def _sync(self, account_id: str, client: ImapClientAdapter, imap) -> None:
+        async with self.sync_slots:
+            await _run_blocking(sync_once, account_id, client, imap)
+
+    async def watch_account(self, account_id: str, key: tuple) -> None:
+        settings = self.settings
+        host, port, username, password_enc, use_ssl = key
+        # A senha é decifrada uma vez por sessão vigiada, não a cada sincronização.
+        client = ImapClientAdapter(host=host, port=port, username=username, password_enc=password_enc, use_ssl=use_ssl)
+        backoff = 5
+        try:
+            while True:
+                imap = None
+                try:
+                    imap = await _run_blocking(client.connect)
+                    await asyncio.to_thread(set_lease, account_id, settings.sync_lease_seconds)
+                    await self._sync(account_id, client, imap)
+                    use_idle = await _run_blocking(client.supports_idle, imap)
+                    logger.info("mailbox_watch_started account_id=%s idle=%s", account_id, use_idle)
+                    backoff = 5
+                    interrupt = partial(client.interrupt, imap)
+                    while True:
+                        if use_idle:
+                            changed = await _run_blocking(
+                                client.idle_wait, imap, settings.mailbox_watcher_idle_seconds, on_cancel=interrupt
+                            )
+                        else:
+                            await asyncio.sleep(settings.mailbox_watcher_poll_seconds)
+                            changed = await _run_blocking(client.poll, imap, on_cancel=interrupt)
+                        await asyncio.to_thread(set_lease, account_id, settings.sync_lease_seconds)
+                        if changed:
+                            await self._sync(account_id, client, imap)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    logger.warning("mailbox_watch_error account_id=%s error=%s", account_id, exc)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 300)
+                finally:
+                    if imap is not None:
+                        await asyncio.to_thread(_logout, imap)
+        finally:
+            # Devolve a conta ao polling do beat.
+            await asyncio.to_thread(set_lease, account_id, None)
+
+    async def refresh(self) -> None:
+        accounts = await asyncio.to_thread(
+            load_shard_accounts, self.shard, self.shards, self.settings.mailbox_watcher_max_sessions
+        )
+        for account_id, task in list(self.stopping.items()):
+            if task.done():
+                del self.stopping[account_id]
+        for account_id, (key, task) in list(self.tasks.items()):
+            if accounts.get(account_id) != key or task.done():
+                task.cancel()
+                self.stopping[account_id] = task
+                del self.tasks[account_id]
+        for account_id, key in accounts.items():
+            if account_id not in self.tasks and account_id not in self.stopping:
+                self.tasks[account_id] = (key, asyncio.create_task(self.watch_account(account_id, key)))
+
+    async def run(self, stop: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        # Cada sessão em IDLE ocupa uma thread enquanto espera o servidor.
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.settings.mailbox_watcher_max_sessions + 4))
+        while not stop.is_set():
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.warning("mailbox_watch_refresh_failed error=%s", exc)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.settings.mailbox_watcher_refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+        tasks = [task for _, task in self.tasks.values()] + list(self.stopping.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _logout(imap) -> None:
+    try:
+        imap.logout()
+    except Exception:
+        pass
+
+
+async def _main(shard: int, shards: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await MailboxWatcher(shard, shards).run(stop)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=f"Vigia caixas IMAP ({SYNC_FOLDER}) via IDLE/NOOP")
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=1)
+    args = parser.parse_args()
+    if not 0 <= args.shard < args.shards:
+        raise SystemExit("--shard deve estar entre 0 e --shards - 1")
+    setup_logging()
+    asyncio.run(_main(args.shard, args.shards))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import logging
+import signal
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+
+from backend.app.adapters.notify.email_notify import EmailNotifyAdapter
+from backend.app.adapters.notify.telegram_notify import TelegramNotifyAdapter
+from backend.app.adapters.notify.webhook_notify import WebhookNotifyAdapter
+from backend.app.adapters.notify.whatsapp_notify import WhatsAppNotifyAdapter
+from backend.app.core.config import get_settings
+from backend.app.core.logging import setup_logging
+from backend.app.db.session import SessionLocal
+from backend.app.domain.notification.service import (
+    claim_notifications,
+    flush_digests,
+    mark_failed,
+    mark_sent,
+    release_notifications,
+    renew_lease,
+)
+
+# Entrega as notificações gravadas em notification_outbox:
+#   python -m backend.app.workers.notification_dispatcher
+# Pode rodar em mais de uma instância: a reserva usa FOR UPDATE SKIP LOCKED e cada envio renova o
+# lease das suas linhas antes de sair, descartando as que outra instância já reservou de novo.
+
+logger = logging.getLogger(__name__)
+
+
+def claim(limit: int, lease_seconds: int) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return claim_notifications(db, limit, lease_seconds)
+    finally:
+        db.close()
+
+
+def flush() -> int:
+    db = SessionLocal()
+    try:
+        return flush_digests(db)
+    finally:
+        db.close()
+
+
+def renew(ids: list[int], leased_until) -> list[int]:
+    db = SessionLocal()
+    try:
+        return renew_lease(db, ids, leased_until, get_settings().notify_lease_seconds)
+    finally:
+        db.close()
+
+
+def release(ids: list[int], leased_until, delay_seconds: float) -> None:
+    db = SessionLocal()
+    try:
+        release_notifications(db, ids, leased_until, delay_seconds)
+    finally:
+        db.close()
+
+
+def finish(sent: list[int], failed: list[int], error: str | None = None) -> None:
+    settings = get_settings()
+    db = SessionLocal()
+    try:
+        mark_sent(db, sent)
+        mark_failed(db, failed, error or "", settings.notify_retry_base_seconds, settings.notify_max_attempts)
+    finally:
+        db.close()
+
+
+def send_direct(channel: str, payload: dict) -> None:
+    if channel == "email":
+        EmailNotifyAdapter().send(payload.get("recipients", []), payload.get("subject", ""), payload.get("body", ""))
+    elif channel == "whatsapp":
+        WhatsAppNotifyAdapter().send(payload.get("numbers", []), payload.get("message", ""))
+    elif channel == "telegram":
+        TelegramNotifyAdapter().send(payload.get("users", []), payload.get("message", ""))
+    else:
+        raise ValueError(f"unknown_channel: {channel}")
+
+
+class NotificationDispatcher:
+    def __init__(self):
+        self.settings = get_settings()
+        self.webhook = WebhookNotifyAdapter()
+        self.host_slots: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.settings.notify_per_host_concurrency)
+        )
+        self.host_queued: dict[str, int] = defaultdict(int)
+        self.inflight: set[asyncio.Task] = set()
+
+    async def deliver_webhook(self, client: httpx.AsyncClient, url: str, items: list[dict]) -> None:
+        host = urlsplit(url).netloc
+        try:
+            async with self.host_slots[host]:
+                owned = set(await asyncio.to_thread(renew, [item["id"] for item in items], items[0]["leased_until"]))
+                items = [item for item in items if item["id"] in owned]
+                if not items:
+                    return
+                ids = [item["id"] for item in items]
+                # Vários eventos para o mesmo endpoint vão num único POST {"events": [...]}.
+                payload = items[0]["payload"] if len(items) == 1 else {"events": [item["payload"] for item in items]}
+                try:
+                    await self.webhook.post(client, url, payload)
+                except Exception as exc:
+                    logger.warning("notify_webhook_failed url=%s events=%s error=%s", url, len(ids), exc)
+                    await asyncio.to_thread(finish, [], ids, str(exc))
+                    return
+            await asyncio.to_thread(finish, ids, [])
+        finally:
+            self.host_queued[host] -= 1
+
+    async def deliver_direct(self, item: dict) -> None:
+        if not await asyncio.to_thread(renew, [item["id"]], item["leased_until"]):
+            return
+        try:
+            await asyncio.to_thread(send_direct, item["channel"], item["payload"])
+        except Exception as exc:
+            logger.warning("notify_failed channel=%s id=%s error=%s", item["channel"], item["id"], exc)
+            await asyncio.to_thread(finish, [], [item["id"]], str(exc))
+            return
+        await asyncio.to_thread(finish, [item["id"]], [])
+
+    def start(self, job) -> None:
+        task = asyncio.create_task(job)
+        self.inflight.add(task)
+        task.add_done_callback(self._job_done)
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self.inflight.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("notify_job_failed error=%s", task.exception())
+
+    async def dispatch(self, client: httpx.AsyncClient, items: list[dict]) -> None:
+        # Não espera o lote: os envios entram no conjunto em voo e o laço volta a reservar assim que
+        # houver vaga. Cada host aceita no máximo notify_per_host_queue envios na fila; o excedente
+        # volta ao outbox na hora, para um host lento não prender os demais nem estourar o lease.
+        settings = self.settings
+        batch_size = max(1, settings.notify_webhook_batch_size)
+        by_url: dict[str, list[dict]] = defaultdict(list)
+        for item in items:
+            if item["channel"] == "webhook":
+                by_url[item["target"]].append(item)
+            else:
+                self.start(self.deliver_direct(item))
+        deferred: list[dict] = []
+        for url, group in by_url.items():
+            host = urlsplit(url).netloc
+            for start in range(0, len(group), batch_size):
+                chunk = group[start : start + batch_size]
+                if self.host_queued[host] >= settings.notify_per_host_queue:
+                    deferred.extend(chunk)
+                    continue
+                self.host_queued[host] += 1
+                self.start(self.deliver_webhook(client, url, chunk))
+        if deferred:
+            await asyncio.to_thread(
+                release,
+                [item["id"] for item in deferred],
+                deferred[0]["leased_until"],
+                settings.notify_webhook_timeout_seconds,
+            )
+
+    async def run(self, stop: asyncio.Event) -> None:
+        settings = self.settings
+        batch_size = max(1, settings.notify_webhook_batch_size)
+        limits = httpx.Limits(
+            max_connections=settings.notify_max_connections,
+            max_keepalive_connections=settings.notify_max_connections,
+            keepalive_expiry=60,
+        )
+        stopped = asyncio.create_task(stop.wait())
+        async with httpx.AsyncClient(timeout=settings.notify_webhook_timeout_seconds, limits=limits) as client:
+            while not stop.is_set():
+                try:
+                    await asyncio.to_thread(flush)
+                except Exception as exc:
+                    logger.warning("notify_digest_flush_failed error=%s", exc)
+                free = settings.notify_max_inflight - len(self.inflight)
+                items = []
+                if free > 0:
+                    try:
+                        items = await asyncio.to_thread(
+                            claim, min(settings.notify_claim_batch_size, free * batch_size), settings.notify_lease_seconds
+                        )
+                    except Exception as exc:
+                        logger.warning("notify_claim_failed error=%s", exc)
+                if items:
+                    await self.dispatch(client, items)
+                    if len(self.inflight) < settings.notify_max_inflight:
+                        continue
+                # Acorda quando um envio termina (vaga livre), no próximo poll ou no sinal de parada.
+                await asyncio.wait(
+                    self.inflight | {stopped}, timeout=settings.notify_poll_seconds, return_when=asyncio.FIRST_COMPLETED
+                )
+            # Dá tempo aos envios em curso; o que sobrar volta ao outbox quando o lease vencer.
+            if self.inflight:
+                await asyncio.wait(self.inflight, timeout=settings.notify_webhook_timeout_seconds * 2)
+        stopped.cancel()
+
+
+async def _main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await NotificationDispatcher().run(stop)
+
+
+def main() -> None:
+    argparse.ArgumentParser(description="Entrega as notificações do outbox").parse_args()
+    setup_logging()
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
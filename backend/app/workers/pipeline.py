@@ -0,0 +1,20 @@
+import asyncio
+from typing import Any, Callable
+
+
+async def _gather_stages(stages: dict[str, Callable[[], Any]]) -> dict[str, Any]:
+    names = list(stages)
+    results = await asyncio.gather(*(asyncio.to_thread(stages[name]) for name in names), return_exceptions=True)
+    return dict(zip(names, results))
+
+
+def run_stages(stages: dict[str, Callable[[], Any]]) -> dict[str, Any]:
+    # Executa estágios independentes (chamadas de I/O bloqueantes) em paralelo; a latência fica
+    # limitada pelo estágio mais lento. O primeiro erro é propagado como na execução sequencial.
+    if not stages:
+        return {}
+    results = asyncio.run(_gather_stages(stages))
+    for name in stages:
+        if isinstance(results[name], BaseException):
+            raise results[name]
+    return results
@@ -6,5 +6,17 @@ celery_app.conf.beat_schedule = {
     "sync-every-5-minutes": {
         "task": "backend.app.workers.tasks.sync_all_accounts",
         "schedule": crontab(minute="*/5"),
-    }
+    },
+    "requeue-stale-classifications-every-minute": {
+        "task": "backend.app.workers.tasks.requeue_stale_classifications",
+        "schedule": crontab(),
+    },
+    "collect-attachment-blobs-daily": {
+        "task": "backend.app.workers.tasks.collect_attachment_blobs",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "evict-extracted-text-cache-hourly": {
+        "task": "backend.app.workers.tasks.evict_extracted_text_cache",
+        "schedule": crontab(minute=15),
+    },
 }
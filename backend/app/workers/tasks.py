@@ -1,13 +1,13 @@
+import logging
+import random
 import uuid
 from datetime import datetime
 
+from celery import group
 from sqlalchemy.orm import Session
 
 from backend.app.adapters.email.imap_client import ImapClientAdapter
-from backend.app.adapters.notify.email_notify import EmailNotifyAdapter
-from backend.app.adapters.notify.telegram_notify import TelegramNotifyAdapter
-from backend.app.adapters.notify.webhook_notify import WebhookNotifyAdapter
-from backend.app.adapters.notify.whatsapp_notify import WhatsAppNotifyAdapter
+from backend.app.core.config import get_settings
 from backend.app.core.limits import can_call_llm, can_process_email
 from backend.app.db.models import (
     Classification,
@@ -17,70 +17,155 @@ from backend.app.db.models import (
     EmailAccount,
     EmailAttachment,
     Extraction,
-    Plan,
-    Tenant,
-    TenantRule,
 )
 from backend.app.db.session import SessionLocal
 from backend.app.domain.audit.service import log_event
 from backend.app.domain.billing.service import get_or_create_usage
-from backend.app.domain.document.service import create_document_from_attachment
+from backend.app.domain.document.service import (
+    create_document_from_attachment,
+    evict_text_cache,
+    extract_text_cached,
+    find_processed_duplicate,
+    set_current_result,
+)
 from backend.app.domain.email.service import (
-    account_sync_due,
-    create_email_attachment,
-    create_email_if_missing,
-    get_account_sync_interval,
+    claim_due_accounts,
+    apply_sync_plan,
+    existing_message_ids,
+    get_sync_state,
+    ingest_messages,
+    release_sync_lease,
 )
-from backend.app.domain.routing.service import route_for_classification
-from backend.app.adapters.storage.local import LocalStorageAdapter
+from backend.app.domain.notification.service import enqueue_document_notifications
+from backend.app.domain.storage.service import collect_garbage, tenant_storage_used
+from backend.app.domain.tenant_config.service import get_tenant_config
+from backend.app.adapters.storage.local import LocalStorageAdapter, StorageLimitExceeded
 from backend.app.engines.extractor.engine import ExtractionEngine
+from backend.app.engines.llm_classifier.batcher import ClassificationBatcher
 from backend.app.engines.llm_classifier.engine import LLMClassifierEngine
 from backend.app.engines.rules_engine.engine import RulesEngine
 from backend.app.engines.validator.engine import ValidatorEngine
-from backend.app.utils.document_text import extract_text_from_file
 from backend.app.workers.celery_app import celery_app
+from backend.app.workers.pipeline import run_stages
 
+logger = logging.getLogger(__name__)
 
-def _tenant_plan(db: Session, tenant_id):
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        return None
-    return db.query(Plan).filter(Plan.name == "Starter").first()
+SYNC_FOLDER = "INBOX"
 
 
-def _notification_channels(db: Session, tenant_id) -> dict:
-    rule = (
-        db.query(TenantRule)
-        .filter(TenantRule.tenant_id == tenant_id, TenantRule.rule_name == "notify:channels")
-        .first()
-    )
-    definition = rule.definition if rule and rule.definition else {}
-    return {
-        "emails": definition.get("emails", []),
-        "whatsapp_numbers": definition.get("whatsapp_numbers", []),
-        "telegram_users": definition.get("telegram_users", []),
-        "email_webhook_url": definition.get("email_webhook_url"),
-        "whatsapp_webhook_url": definition.get("whatsapp_webhook_url"),
-        "telegram_webhook_url": definition.get("telegram_webhook_url"),
-    }
+def _tenant_plan(db: Session, tenant_id):
+    return get_tenant_config(db, tenant_id).plan
 
 
 @celery_app.task(name="backend.app.workers.tasks.sync_all_accounts")
-def sync_all_accounts() -> None:
+def sync_all_accounts() -> int:
+    settings = get_settings()
     db = SessionLocal()
     try:
-        accounts = db.query(EmailAccount).filter(EmailAccount.is_active == True).all()
-        for account in accounts:
-            interval = get_account_sync_interval(db, account.tenant_id, account.id, 5)
-            if not account_sync_due(account, interval):
-                continue
-            sync_email_account.delay(str(account.id))
+        account_ids, lease_until = claim_due_accounts(db, settings.sync_lease_seconds, 5)
     finally:
         db.close()
+    if account_ids:
+        # Jitter espalha as conexões IMAP ao longo da janela em vez de abrir todas no mesmo tick.
+        jitter = settings.sync_enqueue_jitter_seconds
+        group(
+            sync_email_account.s(account_id, False, lease_until.isoformat()).set(
+                countdown=random.uniform(0, jitter) if jitter else 0
+            )
+            for account_id in account_ids
+        ).apply_async()
+    return len(account_ids)
+
+
+def sync_mailbox(db: Session, account: EmailAccount, client: ImapClientAdapter, imap, backfill: bool = False) -> dict:
+    # Usado tanto pela task (conexão nova por execução) quanto pelo mailbox_watcher (sessão mantida aberta).
+    settings = get_settings()
+    batch_size = settings.imap_backfill_batch_size if backfill else settings.imap_sync_batch_size
+    state = get_sync_state(db, account.tenant_id, account.id, SYNC_FOLDER)
+
+    plan = client.plan_sync(
+        imap,
+        SYNC_FOLDER,
+        uidvalidity=state.uidvalidity,
+        last_uid=state.last_uid or 0,
+        highest_modseq=state.highest_modseq,
+        backfill_before_uid=state.backfill_before_uid,
+        batch_size=batch_size,
+        backfill=backfill,
+    )
+    headers = client.fetch_headers(imap, plan["uids"])
+    known = existing_message_ids(db, account.tenant_id, [h["message_id"] for h in headers])
+    storage = LocalStorageAdapter()
+    quota_left = None
+    if settings.storage_tenant_quota_bytes is not None:
+        quota_left = max(0, settings.storage_tenant_quota_bytes - tenant_storage_used(db, account.tenant_id))
+    messages = []
+    for header in headers:
+        if header["message_id"] in known:
+            continue
+        known.add(header["message_id"])
+        attachments = []
+        for part in header["attachments"]:
+            if part["size"] > settings.storage_max_attachment_bytes:
+                logger.warning(
+                    "imap_attachment_skipped message_id=%s part=%s size=%s",
+                    header["message_id"],
+                    part["part"],
+                    part["size"],
+                )
+                continue
+            max_bytes = settings.storage_max_attachment_bytes
+            if quota_left is not None:
+                max_bytes = min(max_bytes, quota_left)
+            filename = (part.get("filename") or "attachment.bin").strip() or "attachment.bin"
+            try:
+                file_path, sha256, size = storage.save_blob_stream(
+                    str(account.tenant_id),
+                    client.iter_part(imap, header["uid"], part),
+                    max_bytes=max_bytes,
+                )
+            except StorageLimitExceeded as exc:
+                logger.warning(
+                    "imap_attachment_skipped message_id=%s part=%s error=%s", header["message_id"], part["part"], exc
+                )
+                continue
+            if not size:
+                continue
+            if quota_left is not None:
+                quota_left -= size
+            attachments.append(
+                {
+                    "filename": filename,
+                    "mime_type": part.get("mime_type"),
+                    "file_path": file_path,
+                    "sha256": sha256,
+                    "size_bytes": size,
+                }
+            )
+        messages.append(
+            {
+                "message_id": header["message_id"],
+                "subject": header["subject"],
+                "sender": header["sender"],
+                "body_text": client.fetch_body_text(imap, header["uid"], header["text_parts"]),
+                "trace_id": uuid.uuid4().hex,
+                "attachments": attachments,
+            }
+        )
+
+    # Um INSERT por tabela e um único commit por lote (junto com o avanço do estado do sync).
+    inserted = ingest_messages(db, account.tenant_id, account.id, messages)
+    apply_sync_plan(state, plan, backfill=backfill)
+    account.last_synced_at = datetime.utcnow()
+    db.commit()
+    for item in inserted:
+        process_email.delay(str(item["id"]))
+    return plan
 
 
 @celery_app.task(name="backend.app.workers.tasks.sync_email_account")
-def sync_email_account(account_id: str) -> None:
+def sync_email_account(account_id: str, backfill: bool = False, lease_until: str | None = None) -> None:
+    # lease_until vem só da reserva do beat; sync manual e backfill não mexem no lease.
     db = SessionLocal()
     try:
         account = db.query(EmailAccount).filter(EmailAccount.id == account_id).first()
@@ -94,42 +179,13 @@ def sync_email_account(account_id: str) -> None:
             password_enc=account.imap_password_enc,
             use_ssl=account.use_ssl,
         )
-        messages = client.fetch_recent()
-
-        for msg in messages:
-            msg["trace_id"] = uuid.uuid4().hex
-            email = create_email_if_missing(db, account.tenant_id, account.id, msg)
-            if email:
-                storage = LocalStorageAdapter()
-                for att in msg.get("attachments", []):
-                    filename = (att.get("filename") or "attachment.bin").strip() or "attachment.bin"
-                    file_path, sha256 = storage.save_attachment(
-                        str(account.tenant_id),
-                        str(email.id),
-                        filename,
-                        att.get("content", b""),
-                    )
-                    create_email_attachment(
-                        db=db,
-                        tenant_id=account.tenant_id,
-                        email_id=email.id,
-                        filename=filename,
-                        mime_type=att.get("mime_type"),
-                        file_path=file_path,
-                        sha256=sha256,
-                    )
-                process_email.delay(str(email.id))
-                log_event(
-                    db,
-                    tenant_id=account.tenant_id,
-                    trace_id=email.trace_id,
-                    event_type="ingestao",
-                    entity_type="email",
-                    entity_id=str(email.id),
-                    payload={"message_id": email.message_id},
-                )
-        account.last_synced_at = datetime.utcnow()
-        db.commit()
+        with client.connect() as imap:
+            plan = sync_mailbox(db, account, client, imap, backfill)
+        if not plan["has_more"]:
+            if lease_until:
+                release_sync_lease(db, account.id, datetime.fromisoformat(lease_until))
+        else:
+            sync_email_account.delay(account_id, backfill, lease_until)
     finally:
         db.close()
 
@@ -188,7 +244,12 @@ def process_email(email_id: str) -> None:
 
 
 @celery_app.task(name="backend.app.workers.tasks.process_document")
-def process_document(document_id: str) -> None:
+def process_document(
+    document_id: str,
+    reuse_duplicates: bool = True,
+    classification: dict | None = None,
+    batch_classification: bool = True,
+) -> None:
     db = SessionLocal()
     try:
         doc = db.query(Document).filter(Document.id == document_id).first()
@@ -202,11 +263,20 @@ def process_document(document_id: str) -> None:
         attachment = None
         attachment_text = ""
         attachment_name = None
+        text_meta: dict = {}
         if doc.attachment_id:
             attachment = db.query(EmailAttachment).filter(EmailAttachment.id == doc.attachment_id).first()
             if attachment:
                 attachment_name = attachment.filename
-                attachment_text = extract_text_from_file(attachment.file_path, attachment.mime_type)
+                extraction_result = extract_text_cached(
+                    db, attachment.file_path, attachment.mime_type, attachment.sha256, filename=attachment.filename
+                )
+                attachment_text = extraction_result.text
+                text_meta = {
+                    "text_truncated": extraction_result.truncated,
+                    "text_pages_covered": extraction_result.pages_covered,
+                    "text_pages_total": extraction_result.pages_total,
+                }
 
         context_chunks = [
             f"Nome do anexo: {attachment_name or ''}",
@@ -225,7 +295,18 @@ def process_document(document_id: str) -> None:
         extraction_engine = ExtractionEngine()
         validator = ValidatorEngine()
 
+        duplicate = None
+        if reuse_duplicates and attachment and attachment.sha256:
+            duplicate = find_processed_duplicate(db, doc.tenant_id, attachment.sha256, doc.doc_type, doc.id)
+
+        doc_type = doc.doc_type or "generic_document"
+        schema = extraction_engine.schema_for(db, doc.tenant_id, doc_type)
+        stages = {}
+
         rr = rules_engine.classify(email.sender or "", email.subject or "", attachment_name)
+        cached = None
+        if rr.confidence < 0.85 and not duplicate and not classification:
+            cached = llm_engine.cached(email.subject or "", email.sender or "", analysis_content)
         if rr.confidence >= 0.85:
             result = {
                 "category": rr.category,
@@ -235,15 +316,67 @@ def process_document(document_id: str) -> None:
                 "reason": rr.reason,
                 "source": "rules",
             }
+        elif duplicate:
+            previous = duplicate[0]
+            result = {
+                "category": previous.category,
+                "department": previous.department,
+                "confidence": float(previous.confidence),
+                "priority": previous.priority,
+                "reason": previous.reason,
+                "source": previous.source,
+            }
+        elif classification:
+            # Resultado já obtido (e contabilizado) pelo lote de classify_pending_documents.
+            result = {**classification, "source": "llm"}
+        elif cached:
+            # Acerto no cache de respostas do LLM não consome a cota de chamadas.
+            result = {**cached, "source": "llm"}
         else:
             if plan and not can_call_llm(plan, usage):
                 doc.status = "FAILED"
                 doc.updated_at = datetime.utcnow()
                 db.commit()
                 return
-            payload = llm_engine.classify(email.subject or "", email.sender or "", analysis_content)
-            usage.llm_calls += 1
+            if batch_classification and get_settings().llm_classify_batch_size > 1:
+                # Grava o texto extraído no cache antes de sair: a segunda passada (com a classificação
+                # do lote) reaproveita o texto em vez de rodar pdftotext/OCR de novo.
+                db.commit()
+                _enqueue_batch_classification(
+                    doc.tenant_id,
+                    {
+                        "id": str(doc.id),
+                        "reuse_duplicates": reuse_duplicates,
+                        "subject": email.subject or "",
+                        "sender": email.sender or "",
+                        "body": analysis_content,
+                    },
+                )
+                return
+            stages["classification"] = lambda: llm_engine.classify_counted(
+                email.subject or "", email.sender or "", analysis_content
+            )
+
+        structured = None
+        if not duplicate and attachment:
+            structured = extraction_engine.extract_structured(
+                schema, doc_type, attachment.file_path, attachment.filename, attachment.mime_type
+            )
+        if duplicate:
+            extracted = dict(duplicate[1].data or {})
+        elif structured is not None:
+            extracted = structured
+        else:
+            stages["extraction"] = lambda: extraction_engine.extract_with_schema(schema, doc_type, analysis_content)
+
+        # Classificação via LLM e extração são independentes depois que analysis_content está pronto.
+        outputs = run_stages(stages)
+        if "classification" in outputs:
+            payload, calls = outputs["classification"]
+            usage.llm_calls += calls
             result = {**payload, "source": "llm"}
+        if "extraction" in outputs:
+            extracted = outputs["extraction"]
 
         classification = Classification(
             tenant_id=doc.tenant_id,
@@ -255,14 +388,9 @@ def process_document(document_id: str) -> None:
             reason=result["reason"],
             source=result["source"],
         )
-        db.add(classification)
-        db.flush()
-
-        extracted = extraction_engine.extract(db, doc.tenant_id, doc.doc_type or "generic_document", analysis_content)
         extraction = Extraction(tenant_id=doc.tenant_id, document_id=doc.id, data=extracted)
-        db.add(extraction)
+        set_current_result(db, doc, classification, extraction)
 
-        schema = extraction_engine.schema_for(db, doc.tenant_id, doc.doc_type or "generic_document")
         required_fields = schema.get("required", []) if isinstance(schema, dict) else []
         valid, errors = validator.validate(extracted, required_fields=required_fields)
         confidence = float(result.get("confidence", 0))
@@ -284,76 +412,12 @@ def process_document(document_id: str) -> None:
         elif confidence < 0.75:
             doc.needs_review = True
 
-        routing = route_for_classification(
-            db,
-            doc.tenant_id,
-            doc.doc_type or "generic_document",
-            classification.category,
-            classification.priority,
-        )
-        notify_emails = routing.get("emails", []) if routing else []
-        channels = _notification_channels(db, doc.tenant_id)
-        all_notify_emails = sorted(set((notify_emails or []) + (channels.get("emails") or [])))
-        EmailNotifyAdapter().send(
-            recipients=all_notify_emails,
-            subject=f"Novo documento {classification.category}",
-            body=f"Documento {doc.id} prioridade {classification.priority}",
-        )
-        if channels.get("email_webhook_url"):
-            WebhookNotifyAdapter().send(
-                channels.get("email_webhook_url"),
-                {
-                    "channel": "email",
-                    "recipients": all_notify_emails,
-                    "subject": f"Novo documento {classification.category}",
-                    "message": f"Documento {doc.id} prioridade {classification.priority}",
-                    "document_id": str(doc.id),
-                    "trace_id": doc.trace_id,
-                },
-            )
-        message = f"Novo documento {classification.category} ({doc.doc_type}) prioridade {classification.priority}"
-        WhatsAppNotifyAdapter().send(channels.get("whatsapp_numbers", []), message)
-        if channels.get("whatsapp_webhook_url"):
-            WebhookNotifyAdapter().send(
-                channels.get("whatsapp_webhook_url"),
-                {
-                    "channel": "whatsapp",
-                    "numbers": channels.get("whatsapp_numbers", []),
-                    "message": message,
-                    "document_id": str(doc.id),
-                    "trace_id": doc.trace_id,
-                },
-            )
-        TelegramNotifyAdapter().send(channels.get("telegram_users", []), message)
-        if channels.get("telegram_webhook_url"):
-            WebhookNotifyAdapter().send(
-                channels.get("telegram_webhook_url"),
-                {
-                    "channel": "telegram",
-                    "users": channels.get("telegram_users", []),
-                    "message": message,
-                    "document_id": str(doc.id),
-                    "trace_id": doc.trace_id,
-                },
-            )
-        if routing and routing.get("webhook_url"):
-            WebhookNotifyAdapter().send(
-                routing.get("webhook_url"),
-                {
-                    "document_id": str(doc.id),
-                    "trace_id": doc.trace_id,
-                    "doc_type": doc.doc_type,
-                    "category": classification.category,
-                    "priority": classification.priority,
-                    "needs_review": doc.needs_review,
-                    "extraction": extracted,
-                },
-            )
-
         doc.status = "DONE"
         doc.updated_at = datetime.utcnow()
         usage.emails_processed += 1
         email.status = "DONE"
+        # Notificações vão para o outbox no mesmo commit do resultado; o notification_dispatcher entrega.
+        enqueue_document_notifications(db, doc, result["category"], result["priority"], extracted)
         db.commit()
 
         log_event(
@@ -363,7 +427,7 @@ def process_document(document_id: str) -> None:
             event_type="pipeline_done",
             entity_type="document",
             entity_id=str(doc.id),
-            payload={"classification": classification.category},
+            payload={"classification": classification.category, **text_meta},
         )
     except Exception as exc:
         db.rollback()
@@ -384,3 +448,87 @@ def process_document(document_id: str) -> None:
             db.commit()
     finally:
         db.close()
+
+
+def _enqueue_batch_classification(tenant_id, item: dict) -> None:
+    settings = get_settings()
+    batcher = ClassificationBatcher()
+    pending = batcher.submit(tenant_id, item)
+    if pending >= settings.llm_classify_batch_size:
+        classify_pending_documents.delay(str(tenant_id))
+    elif batcher.claim_flush(tenant_id, settings.llm_classify_batch_window_seconds):
+        classify_pending_documents.apply_async(
+            (str(tenant_id),), countdown=settings.llm_classify_batch_window_seconds
+        )
+
+
+@celery_app.task(name="backend.app.workers.tasks.classify_pending_documents")
+def classify_pending_documents(tenant_id: str) -> int:
+    settings = get_settings()
+    batcher = ClassificationBatcher()
+    # Libera a janela antes de drenar: itens que chegarem depois agendam um novo flush.
+    batcher.release_flush(tenant_id)
+    batch_id, items = batcher.drain(tenant_id, settings.llm_classify_batch_size)
+    if not items:
+        return 0
+
+    try:
+        results, calls = LLMClassifierEngine().classify_many(items)
+    except Exception:
+        logger.exception("batch classification failed for tenant %s", tenant_id)
+        for item in items:
+            process_document.delay(item["id"], item.get("reuse_duplicates", True), None, False)
+        batcher.ack(tenant_id, batch_id)
+        return 0
+
+    db = SessionLocal()
+    try:
+        usage = get_or_create_usage(db, uuid.UUID(tenant_id))
+        usage.llm_calls += calls
+        db.commit()
+    finally:
+        db.close()
+
+    for item, result in zip(items, results):
+        if result is None:
+            # Classificação individual falhou: o documento tenta de novo fora do lote.
+            process_document.delay(item["id"], item.get("reuse_duplicates", True), None, False)
+        else:
+            process_document.delay(item["id"], item.get("reuse_duplicates", True), result)
+    batcher.ack(tenant_id, batch_id)
+    if batcher.pending(tenant_id):
+        classify_pending_documents.delay(tenant_id)
+    return len(items)
+
+
+@celery_app.task(name="backend.app.workers.tasks.requeue_stale_classifications")
+def requeue_stale_classifications() -> int:
+    # Lotes drenados por um classify_pending_documents que morreu antes do ack voltam para a fila.
+    settings = get_settings()
+    batcher = ClassificationBatcher()
+    requeued = 0
+    for tenant_id in batcher.processing_tenants():
+        count = batcher.requeue_stale(tenant_id, settings.llm_classify_processing_timeout_seconds)
+        if count:
+            logger.warning("requeued %s stale classification items for tenant %s", count, tenant_id)
+            requeued += count
+            classify_pending_documents.delay(tenant_id)
+    return requeued
+
+
+@celery_app.task(name="backend.app.workers.tasks.collect_attachment_blobs")
+def collect_attachment_blobs() -> int:
+    db = SessionLocal()
+    try:
+        return collect_garbage(db, get_settings().storage_blob_gc_grace_hours)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="backend.app.workers.tasks.evict_extracted_text_cache")
+def evict_extracted_text_cache() -> int:
+    db = SessionLocal()
+    try:
+        return evict_text_cache(db, get_settings().text_cache_max_bytes)
+    finally:
+        db.close()
@@ -0,0 +1,88 @@
+import argparse
+import time
+from pathlib import Path
+
+from backend.app.engines.extractor.local import local_extract
+from backend.app.engines.extractor.schemas import BUILTIN_SCHEMA_BY_DOC_TYPE, DEFAULT_SCHEMA
+from backend.app.utils.file_types import infer_doc_type
+from backend.benchmarks.legacy_local_extractor import legacy_local_extract
+
+# Micro-benchmark do extrator local:
+#   python -m backend.benchmarks.local_extractor --corpus ./corpus --repeat 200
+# O corpus é um diretório de .txt com o texto já extraído dos anexos; o doc_type vem do nome
+# do arquivo (mesma regra de infer_doc_type). Sem --corpus, usa as amostras abaixo.
+
+SAMPLES = {
+    "nfse.txt": (
+        "PREFEITURA MUNICIPAL\nNúmero da NFS-e\n1234\nData e Hora da Emissão 01/02/2024 10:15:00\n"
+        "PRESTADOR DO SERVIÇO\nCNPJ 12.345.678/0001-90\nTOMADOR DO SERVIÇO\nCNPJ 98.765.432/0001-10\n"
+        "Chave de Acesso da NFS-e\n12345678901234567890123456789012345678901234\n"
+        "Valor dos Serviços R$ 1.000,00\nValor do ISS R$ 50,00\nValor Total da NFS-e R$ 1.000,00\n"
+    ),
+    "certificado_nr10.txt": (
+        "CERTIFICADO\nCertificamos que JOAO DA SILVA participou do treinamento NR-10 Básico em conformidade "
+        "com a NR-10, com carga horária de 40 horas.\nEMPRESA DE TREINAMENTOS LTDA\n12.345.678/0001-90\n"
+        "CPF 123.456.789-09\nSão Paulo, 10/03/2023\n"
+    ),
+    "apresentacao_treinamento.txt": (
+        "Produto: Treinamento NR-10 SEP\nFoco em eletricistas de manutenção industrial\n"
+        "Referências: NR-10, NR-12, NBR-5410\n"
+    ),
+}
+
+
+def load_corpus(directory: str | None) -> list[tuple[str, str]]:
+    if not directory:
+        return [(infer_doc_type(name), text) for name, text in SAMPLES.items()]
+    return [
+        (infer_doc_type(path.name), path.read_text(encoding="utf-8", errors="ignore"))
+        for path in sorted(Path(directory).glob("*.txt"))
+    ]
+
+
+def _time(corpus: list[tuple[str, str]], repeat: int, extract) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for doc_type, text in corpus:
+            extract(doc_type, text)
+    return time.perf_counter() - started
+
+
+def run(corpus: list[tuple[str, str]], repeat: int) -> None:
+    # Antes: implementação anterior ao registro (legacy_local_extractor.py), que avalia todos os campos.
+    # Depois: registro por doc_type, com todos os campos e só com os campos do schema.
+    for doc_type, text in corpus:
+        if legacy_local_extract(text, doc_type) != local_extract(text, doc_type):
+            print(f"aviso: saída diferente da implementação antiga para doc_type={doc_type}")
+
+    def schema_fields(doc_type: str) -> set[str]:
+        return set(BUILTIN_SCHEMA_BY_DOC_TYPE.get(doc_type, DEFAULT_SCHEMA)["properties"])
+
+    total = repeat * len(corpus)
+    baseline = None
+    for label, extract in (
+        ("antes (legado)", lambda doc_type, text: legacy_local_extract(text, doc_type)),
+        ("depois, todos os campos", lambda doc_type, text: local_extract(text, doc_type)),
+        ("depois, campos do schema", lambda doc_type, text: local_extract(text, doc_type, schema_fields(doc_type))),
+    ):
+        elapsed = _time(corpus, repeat, extract)
+        baseline = baseline or elapsed
+        print(
+            f"{label}: {total} docs em {elapsed:.3f}s "
+            f"({elapsed / max(total, 1) * 1e6:.1f} µs/doc, {baseline / max(elapsed, 1e-9):.2f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do extrator local")
+    parser.add_argument("--corpus", help="diretório com arquivos .txt")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        raise SystemExit("corpus vazio")
+    run(corpus, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
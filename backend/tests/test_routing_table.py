@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from backend.app.domain.routing.table import RoutingTable
+
+
+def legacy_match(routes: list[dict], doc_type: str, category: str, priority: str) -> dict | None:
+    # Busca linear de route_for_classification antes da tabela compilada (primeiro match vence).
+    normalized_priority = (priority or "").lower()
+    if normalized_priority == "normal":
+        normalized_priority = "medium"
+    for definition in routes:
+        if definition.get("doc_type") and definition.get("doc_type") != doc_type:
+            continue
+        if definition.get("category") and definition.get("category") != category:
+            continue
+        rule_priority = (definition.get("priority") or "").lower()
+        if rule_priority == "normal":
+            rule_priority = "medium"
+        if rule_priority and rule_priority != normalized_priority:
+            continue
+        return definition
+    return None
+
+
+DOC_TYPES = ["invoice", "fiscal_xml", "training_certificate", "generic_document"]
+CATEGORIES = ["fiscal", "financeiro", "treinamento", "generic"]
+PRIORITIES = ["high", "medium", "normal", "low", "HIGH", "Normal"]
+QUERIES = [(d, c, p) for d in DOC_TYPES + [""] for c in CATEGORIES + [""] for p in PRIORITIES + ["", None]]
+
+
+def _route(name: str, doc_type=None, category=None, priority=None) -> dict:
+    return {"name": name, "doc_type": doc_type, "category": category, "priority": priority, "department": name}
+
+
+# Definição de notify:channels como gravada por POST /configs/notifications: tem "emails" e por isso
+# entra em config.routes (load_tenant_config) como uma rota sem doc_type/category/priority.
+NOTIFY_CHANNELS = {
+    "emails": ["financeiro@example.com"],
+    "whatsapp_numbers": [],
+    "telegram_users": [],
+    "email_webhook_url": None,
+    "whatsapp_webhook_url": None,
+    "telegram_webhook_url": None,
+    "digest_channels": [],
+    "digest_window_seconds": 60,
+    "digest_max_documents": 50,
+}
+
+
+RULE_SETS = {
+    "empty": [],
+    "wildcards": [
+        _route("fiscal_high", "fiscal_xml", "fiscal", "high"),
+        _route("fiscal_any", None, "fiscal", None),
+        _route("invoice_any", "invoice", "", ""),
+        _route("catch_all"),
+    ],
+    "catch_all_first": [
+        _route("catch_all"),
+        _route("fiscal_high", "fiscal_xml", "fiscal", "high"),
+    ],
+    "notify_channels": [
+        _route("training", "training_certificate", "treinamento", None),
+        NOTIFY_CHANNELS,
+        _route("invoice_high", "invoice", "financeiro", "high"),
+    ],
+    "priority_aliases": [
+        _route("normal", None, None, "normal"),
+        _route("medium", None, None, "medium"),
+        _route("upper_high", None, "financeiro", "HIGH"),
+        _route("low", "invoice", None, "low"),
+    ],
+    "duplicate_keys": [
+        _route("first", "invoice", "fiscal", "high"),
+        _route("second", "invoice", "fiscal", "high"),
+        _route("generic_first", None, "generic", None),
+        _route("generic_second", None, "generic", ""),
+    ],
+}
+
+
+@pytest.mark.parametrize("name", sorted(RULE_SETS))
+def test_matches_legacy_first_match(name):
+    routes = RULE_SETS[name]
+    table = RoutingTable(routes)
+    for query in QUERIES:
+        assert table.match(*query) is legacy_match(routes, *query), query
+
+
+def test_duplicate_key_keeps_first_rule():
+    table = RoutingTable(RULE_SETS["duplicate_keys"])
+    assert table.match("invoice", "fiscal", "high")["name"] == "first"
+    assert table.match("fiscal_xml", "generic", "low")["name"] == "generic_first"
+
+
+def test_normal_and_medium_are_the_same_priority():
+    table = RoutingTable(RULE_SETS["priority_aliases"])
+    assert table.match("fiscal_xml", "fiscal", "medium")["name"] == "normal"
+    assert table.match("fiscal_xml", "fiscal", "Normal")["name"] == "normal"
+    assert table.match("fiscal_xml", "financeiro", "high")["name"] == "upper_high"
+
+
+def test_no_match_returns_none():
+    table = RoutingTable([_route("fiscal_only", None, "fiscal", None)])
+    assert table.match("invoice", "generic", "high") is None
+
+
+def test_notify_channels_definition_is_a_catch_all_route():
+    table = RoutingTable(RULE_SETS["notify_channels"])
+    assert table.match("training_certificate", "treinamento", "low")["name"] == "training"
+    assert table.match("invoice", "financeiro", "high") is NOTIFY_CHANNELS
+
+
+def test_random_rule_sets_match_legacy():
+    rng = random.Random(16)
+    values = {
+        "doc_type": DOC_TYPES + [None, ""],
+        "category": CATEGORIES + [None, ""],
+        "priority": PRIORITIES + [None, ""],
+    }
+    for _ in range(500):
+        routes = [
+            {"name": f"r{i}", **{field: rng.choice(options) for field, options in values.items()}}
+            for i in range(rng.randint(0, 12))
+        ]
+        table = RoutingTable(routes)
+        for query in QUERIES:
+            assert table.match(*query) is legacy_match(routes, *query), (routes, query)